@@ -0,0 +1,112 @@
+"""
+Connection density: opens N in-process connections through Channels' `WebsocketCommunicator` and reports the memory
+held per idle connection, then per connection once every one of them made a request, and allocated per request.
+a plain Channels `AsyncJsonWebsocketConsumer` is measured too, the difference is what the router costs. e.g.:
+
+    python -m benchmarks.density
+    python -m benchmarks.density -n 5000 -c async --json density.json
+
+the communicators (their queues and tasks) are counted with the connections, on both sides of the difference.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Dict, List, Type
+
+from .run import print_table
+from .settings import configure
+
+CONSUMERS = ('baseline', 'async', 'sync')
+
+
+def consumers(names: List[str]) -> Dict[str, Type]:
+    from channels.generic.websocket import AsyncJsonWebsocketConsumer
+    from django_observable_socket import AsyncSocketRouterConsumer, SocketRouterConsumer
+
+    class Baseline(AsyncJsonWebsocketConsumer):
+        async def receive_json(self, content, **kwargs):
+            await self.send_json({'uuid': content['uuid'], 'status': 200, 'headers': None, 'payload': content['payload']})
+
+    def router(base: Type) -> Type:
+        return type('DensitySocket', (base,), {'_routes': [{'route': 'echo'}],
+                                              'on_echo': lambda self, arg: {'payload': arg.payload}})
+
+    built = {'baseline': Baseline, 'async': router(AsyncSocketRouterConsumer), 'sync': router(SocketRouterConsumer)}
+    return {name: built[name] for name in names}
+
+
+def traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def measure(consumer: Type, connections: int) -> Dict:
+    from channels.testing import WebsocketCommunicator
+
+    frame = json.dumps({'uuid': 1, 'route': 'echo', 'headers': None, 'payload': {'id': 1}})
+    communicators = []
+    tracemalloc.start()
+    try:
+        before = traced()
+        for i in range(connections):
+            communicator = WebsocketCommunicator(consumer.as_asgi(), '/ws/')
+            communicator.scope['user'] = None
+            communicator.scope['client'] = ('127.0.0.1', 10000 + i % 50000)
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise RuntimeError(f'{consumer.__name__} refused the connection')
+            communicators.append(communicator)
+        idle = traced()
+
+        peaks = 0
+        for communicator in communicators:
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await communicator.send_to(text_data=frame)
+            await communicator.receive_from(timeout=10)
+            peaks += tracemalloc.get_traced_memory()[1] - current
+        used = traced()
+    finally:
+        tracemalloc.stop()
+        for communicator in communicators:
+            await communicator.disconnect()
+
+    return {
+        'connections': connections,
+        'idle_bytes_per_connection': round((idle - before) / connections),
+        'used_bytes_per_connection': round((used - before) / connections),
+        'peak_bytes_per_request': round(peaks / connections),
+    }
+
+
+def main(argv: List[str] | None = None):
+    configure()
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.density', description=__doc__.split('\n\n')[0])
+    parser.add_argument('-n', '--connections', type=int, default=1000)
+    parser.add_argument('-c', '--consumer', nargs='+', choices=CONSUMERS, default=list(CONSUMERS))
+    parser.add_argument('--json', nargs='?', const='-', metavar='PATH',
+                        help='write the results as JSON, to stdout when PATH is omitted')
+    options = parser.parse_args(argv)
+
+    results = []
+    for name, consumer in consumers(options.consumer).items():
+        results.append({'consumer': name, **asyncio.run(measure(consumer, options.connections))})
+
+    columns = ('consumer', 'connections', 'idle_bytes_per_connection', 'used_bytes_per_connection',
+               'peak_bytes_per_request')
+    titles = ('consumer', 'connections', 'idle B/conn', 'used B/conn', 'peak B/request')
+    if options.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    if options.json is not None:
+        with open(options.json, 'w') as output:
+            json.dump(results, output, indent=2)
+    print_table(results, columns, titles)
+
+
+if __name__ == '__main__':
+    main()
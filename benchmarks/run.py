@@ -0,0 +1,174 @@
+"""
+Drives `SocketRouterConsumer` and `AsyncSocketRouterConsumer` in-process, through Channels' `WebsocketCommunicator`
+and the in-memory channel layer, and reports messages per second, p50/p99 round-trip latency and memory allocated
+per message. runs offline, e.g.:
+
+    python -m benchmarks
+    python -m benchmarks -s ping dispatch -c async -n 5000
+    python -m benchmarks --json results.json
+
+every request is a full round trip (sent, then its response awaited), so the numbers include the communicator's own
+overhead, which stays the same between releases.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import platform
+import sys
+import tracemalloc
+from time import perf_counter
+from typing import Dict, List, Type
+
+from .settings import configure
+
+CONSUMERS = ('async', 'sync')
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+async def connect(consumer: Type):
+    from channels.testing import WebsocketCommunicator
+
+    communicator = WebsocketCommunicator(consumer.as_asgi(), '/ws/')
+    communicator.scope['user'] = None
+    communicator.scope['client'] = ('127.0.0.1', 50000)
+    connected, _ = await communicator.connect()
+    if not connected:
+        raise RuntimeError(f'{consumer.__name__} refused the connection')
+    return communicator
+
+
+async def round_trips(communicator, frames: List[str], latencies: List[float] | None = None):
+    for frame in frames:
+        start = perf_counter()
+        await communicator.send_to(text_data=frame)
+        await communicator.receive_from(timeout=10)
+        if latencies is not None:
+            latencies.append(perf_counter() - start)
+
+
+async def measure(consumer: Type, frames: List[str], messages: int, warmup: int, traced: int) -> Dict:
+    communicator = await connect(consumer)
+    try:
+        await round_trips(communicator, frames[:warmup])
+
+        latencies: List[float] = []
+        gc.collect()
+        start = perf_counter()
+        await round_trips(communicator, frames[:messages], latencies)
+        elapsed = perf_counter() - start
+
+        # tracing slows everything down, so allocations are measured on a separate, shorter, run
+        traced_frames = frames[:traced]
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        peaks = 0
+        for frame in traced_frames:
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            await round_trips(communicator, [frame])
+            peaks += tracemalloc.get_traced_memory()[1] - current
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+    finally:
+        await communicator.disconnect()
+
+    latencies.sort()
+    return {
+        'messages': messages,
+        'messages_per_second': round(messages / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'peak_bytes_per_message': round(peaks / len(traced_frames)),
+        'retained_bytes_per_message': round(retained / len(traced_frames)),
+    }
+
+
+def consumer_bases(names: List[str]) -> Dict[str, Type]:
+    from django_observable_socket import AsyncSocketRouterConsumer, SocketRouterConsumer
+
+    bases = {'async': AsyncSocketRouterConsumer, 'sync': SocketRouterConsumer}
+    return {name: bases[name] for name in names}
+
+
+def build(scenario, base: Type, slim: bool) -> Type:
+    consumer = scenario.build(base)
+    if slim:
+        consumer = type(consumer.__name__, (consumer,), {'slim_envelopes': True})
+    return consumer
+
+
+COLUMNS = ('scenario', 'consumer', 'messages_per_second', 'p50_ms', 'p99_ms', 'peak_bytes_per_message',
+           'retained_bytes_per_message')
+TITLES = ('scenario', 'consumer', 'msg/s', 'p50 ms', 'p99 ms', 'peak B/msg', 'retained B/msg')
+
+
+def print_table(results: List[Dict], columns=COLUMNS, titles=TITLES, out=sys.stdout):
+    """names are left aligned, numbers right aligned"""
+    rows = [titles] + [tuple(str(result[column]) for column in columns) for result in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    names = [bool(results) and isinstance(results[0][column], str) for column in columns]
+    for row in rows:
+        print('  '.join(cell.ljust(width) if name else cell.rjust(width)
+                        for cell, width, name in zip(row, widths, names)), file=out)
+
+
+def main(argv: List[str] | None = None):
+    configure()
+    from .scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.split('\n\n')[0])
+    parser.add_argument('-s', '--scenario', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('-c', '--consumer', nargs='+', choices=CONSUMERS, default=list(CONSUMERS))
+    parser.add_argument('-n', '--messages', type=int, default=2000, help='measured round trips per run')
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--traced', type=int, default=200, help='round trips traced for allocations')
+    parser.add_argument('--slim', action='store_true', help='run the consumers with `slim_envelopes`')
+    parser.add_argument('--json', nargs='?', const='-', metavar='PATH',
+                        help='write the results as JSON, to stdout when PATH is omitted')
+    options = parser.parse_args(argv)
+
+    # failing requests are still logged, but not printed
+    package_logger = logging.getLogger('django_observable_socket')
+    package_logger.addHandler(logging.NullHandler())
+    package_logger.propagate = False
+
+    results = []
+    for name in options.scenario:
+        scenario = SCENARIOS[name]
+        frames = scenario.frames(max(options.messages, options.warmup, options.traced))
+        for consumer_name, base in consumer_bases(options.consumer).items():
+            consumer = build(scenario, base, options.slim)
+            result = asyncio.run(measure(consumer, frames, options.messages, options.warmup, options.traced))
+            results.append({'scenario': name, 'consumer': consumer_name, **result})
+
+    if options.json is None:
+        print_table(results)
+        return
+
+    import django
+    import channels
+    import pydantic
+    report = {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'channels': channels.__version__,
+        'pydantic': pydantic.VERSION,
+        'slim_envelopes': options.slim,
+        'results': results,
+    }
+    if options.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(options.json, 'w') as output:
+            json.dump(report, output, indent=2)
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark scenarios. every scenario builds a consumer class on top of the consumer it's run with, and the frames a
+client sends to it. frames are encoded upfront, so only the server side is measured (plus the in-process transport).
+import it once Django is configured, see `settings.configure`.
+"""
+import json
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Type
+
+from django_observable_socket.classes import PING, GenericRouteInfo
+from django_observable_socket.tools import route_to_method_name
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    description: str
+    build: Callable[[Type], Type]
+    """takes the consumer base class, returns the consumer to benchmark"""
+
+    frames: Callable[[int], List[str]]
+    """the `count` frames a client sends, in order"""
+
+
+def _request(uuid: int, route: str, payload=None, headers=None) -> str:
+    return json.dumps({'uuid': uuid, 'route': route, 'headers': headers, 'payload': payload})
+
+
+# PING storm
+
+def _ping_consumer(base: Type) -> Type:
+    return type('PingSocket', (base,), {'_routes': [{'route': 'noop'}], 'on_noop': lambda self, arg: {}})
+
+
+def _ping_frames(count: int) -> List[str]:
+    return [json.dumps({'uuid': i, 'route': PING}) for i in range(count)]
+
+
+# 100-route dispatch
+
+ROUTES = 100
+
+
+def _dispatch_consumer(base: Type) -> Type:
+    attrs: Dict = {'_routes': [{'route': f'route{i}Get'} for i in range(ROUTES)]}
+    for i in range(ROUTES):
+        attrs[route_to_method_name(f'route{i}Get')] = lambda self, arg: {'payload': arg.payload}
+    return type('DispatchSocket', (base,), attrs)
+
+
+def _dispatch_frames(count: int) -> List[str]:
+    return [_request(i, f'route{i % ROUTES}Get', {'id': i}) for i in range(count)]
+
+
+# large payload dehydration
+
+ROWS = 1000
+
+
+@dataclass
+class Row:
+    id: int
+    title: str
+    score: float
+    tags: List[str]
+
+
+_TABLE = [Row(i, f'title {i}', i / 7, ['a', 'b', 'c']) for i in range(ROWS)]
+
+
+def _dehydrate_rows(rows: List[Row]) -> List[dict]:
+    return [{'id': row.id, 'title': row.title, 'score': row.score, 'tags': row.tags} for row in rows]
+
+
+def _dehydrate_consumer(base: Type) -> Type:
+    return type('TableSocket', (base,), {
+        '_routes': [GenericRouteInfo(route='table', dehydrate=_dehydrate_rows)],
+        'on_table': lambda self, arg: {'payload': _TABLE},
+    })
+
+
+def _dehydrate_frames(count: int) -> List[str]:
+    return [_request(i, 'table') for i in range(count)]
+
+
+# hydrate-heavy routes
+
+ITEMS = 200
+
+
+def _check_order(arg) -> bool:
+    return isinstance(arg.payload, dict) and isinstance(arg.payload.get('lines'), list)
+
+
+def _can_order(arg) -> bool:
+    return arg.headers is not None and arg.headers.get('token') == 'secret'
+
+
+def _hydrate_order(arg) -> List[Row]:
+    return [Row(line['id'], line['title'], line['score'], line['tags']) for line in arg.payload['lines']]
+
+
+def _hydrate_consumer(base: Type) -> Type:
+    return type('OrderSocket', (base,), {
+        '_routes': [GenericRouteInfo(route='order', check_data=_check_order, check_access=_can_order,
+                                     hydrate=_hydrate_order, dehydrate=lambda total: {'total': total})],
+        'on_order': lambda self, arg: {'payload': sum(row.score for row in arg.payload)},
+    })
+
+
+def _hydrate_frames(count: int) -> List[str]:
+    lines = _dehydrate_rows(_TABLE[:ITEMS])
+    return [_request(i, 'order', {'lines': lines}, {'token': 'secret'}) for i in range(count)]
+
+
+# error paths
+
+def _failing_handler(self, arg):
+    raise RuntimeError('benchmark failure')
+
+
+def _errors_consumer(base: Type) -> Type:
+    return type('ErrorSocket', (base,), {
+        '_routes': [{'route': 'strict', 'check_data': lambda arg: False}, {'route': 'fail'}],
+        'on_strict': lambda self, arg: {},
+        'on_fail': _failing_handler,
+    })
+
+
+def _errors_frames(count: int) -> List[str]:
+    kinds = (
+        lambda i: _request(i, 'missing'),  # 404
+        lambda i: '{"uuid": %d, "route": ' % i,  # 400, malformed
+        lambda i: _request(i, 'strict'),  # 400, check_data
+        lambda i: _request(i, 'fail'),  # 500
+    )
+    return [kinds[i % len(kinds)](i) for i in range(count)]
+
+
+SCENARIOS: Dict[str, Scenario] = {scenario.name: scenario for scenario in (
+    Scenario('ping', 'PING storm, answered before any model is built', _ping_consumer, _ping_frames),
+    Scenario('dispatch', f'{ROUTES} routes, requests spread over all of them', _dispatch_consumer, _dispatch_frames),
+    Scenario('dehydrate', f'{ROWS} rows dehydrated into a large response', _dehydrate_consumer, _dehydrate_frames),
+    Scenario('hydrate', f'check_data, check_access and hydrate of {ITEMS} lines', _hydrate_consumer, _hydrate_frames),
+    Scenario('errors', '404, malformed frame, failing check_data and 500, in turn', _errors_consumer, _errors_frames),
+)}
@@ -1,16 +1,39 @@
-import inspect
+import asyncio
 import logging
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from functools import partial
+from time import perf_counter
+from typing import Any, Coroutine, Hashable, List
 
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
-from pydantic import ValidationError
+from pydantic import BaseModel
 
-from .classes import BaseRouter, StatusCodes, RequestMessage, ResponseMessage, set_error, CallError, \
-    GenericRouteInfo, enforce_routes
-from .classes.types import HandlerArg, SocketResult
-from .tools import route_to_method_name, result_is_successful
+from .classes import BaseRouter, StatusCodes, RequestMessage, ResponseMessage, PreparedResponse, set_error, CallError, \
+    enforce_routes, encode_payload, is_heartbeat, may_be_heartbeat, Subscriptions, UNSUBSCRIBE, PONG, \
+    CANCEL, is_cancel, may_be_cancel
+from .classes.batching import HydrateBatcher, worker_batcher
+from .classes.codec import content_uuid
+from .classes.state import ConnectionState
+from .classes.envelope import SlimRequest
+from .classes.limits import too_large
+from .classes.memo import store_writes
+from .classes.metrics import MetricsSink, BATCH
+from .classes.rate_limit import RateLimit
+from .classes.replay import replayable
+from .classes.scheduler import Scheduler
+from .classes.stream import StreamedResponse, is_stream
+from .classes.delta import SUBSCRIPTION
+from .classes.conditional import ETAG, requested_version, content_version, with_etag
+from .classes.dispatch import RouteEntry
+from .classes.execution import Execution, ExecutionPolicy, get_executor, run_in_executor
+from .classes.types import SocketResult
+from .tools import result_is_successful
 
 logger = logging.getLogger(__name__)
 
+_NO_METRICS = MetricsSink()
+
 class AsyncSocketRouterConsumer(AsyncJsonWebsocketConsumer, BaseRouter):
     from django.conf import settings
     User = settings.AUTH_USER_MODEL
@@ -44,6 +67,40 @@ class AsyncSocketRouterConsumer(AsyncJsonWebsocketConsumer, BaseRouter):
         if cls is not AsyncSocketRouterConsumer:
             enforce_routes(cls)
 
+    concurrent_requests: bool = False
+    """
+        when enabled, every request runs as its own task, so a slow route doesn't hold back later messages
+        (heartbeats included) on the same socket. responses are sent in completion order and matched by `uuid` on the client.
+    """
+
+    max_in_flight: int = 16
+    """
+        upper bound of concurrently running requests per connection when `concurrent_requests` is enabled.
+        once reached, the next requests wait for a running one to finish, while heartbeats and `CANCEL` messages
+        are still answered right away.
+    """
+
+    max_queued: int = 64
+    """
+        upper bound of requests waiting for one of the `max_in_flight` slots per connection, the ones above it
+        are answered with `SERVICE_UNAVAILABLE` and a `Retry-After` header instead of being queued
+    """
+
+    execution: ExecutionPolicy = {}
+    """
+        where sync hooks of every route run, per hook: `{'hydrate': 'thread', 'dehydrate': 'process'}`.
+        by default they run inline on the event loop, routes may override it with their own `execution`.
+    """
+
+    scheduler: Scheduler | None = None
+    """
+        admits the requests of every connection by the `lane` of their route and sheds the less urgent ones when
+        the worker is overloaded, see `Scheduler`. a single instance is shared by all connections of the consumer
+    """
+
+    thread_pool_size: int = 8
+    process_pool_size: int = 2
+
     _user = None
 
     @property
@@ -52,96 +109,616 @@ class AsyncSocketRouterConsumer(AsyncJsonWebsocketConsumer, BaseRouter):
 
     async def connect(self):
         self._user = self.scope['user'] if self._user is None else self._user
-        await self.accept()
+        self.negotiate_compression()
+        await self.accept(subprotocol=self.negotiate_codec())
 
-    async def receive_json(self, content, **kwargs):
-        try:
-            message = RequestMessage(**content)
-            if message.route == 'PING':  # only heart-bit checks, response, so the client makes sure the connection is open
-                await self.send_json(
-                    RequestMessage(
-                        route='PONG',
-                        uuid=message.uuid
-                    ).model_dump()
-                )
+    async def disconnect(self, code):
+        state = self._state
+        if state is None:
+            return
+        self._state = None
+
+        # nobody is listening for the results anymore
+        if state.in_flight:
+            for task in tuple(state.in_flight.values()):
+                task.cancel()
+
+        if state.subscriptions:
+            for group in state.subscriptions.groups():
+                await self.channel_layer.group_discard(group, self.channel_name)
+
+    @classmethod
+    async def decode_json(cls, text_data):
+        return cls.codec.decode(text_data)
+
+    @classmethod
+    async def encode_json(cls, content):
+        return cls.codec.encode(content)
+
+    async def send_json(self, content, close=False):
+        """sends `content` encoded by the connection's codec (the negotiated one, see `codecs`), as a text or binary frame"""
+        await self.send_frame(self.codec.encode(content))
+        if close:
+            await self.close()
+
+    async def send_frame(self, frame: str | bytes):
+        state = self._state
+        compression = state.compression if state is not None else None
+        if compression is not None and len(frame) >= compression.threshold:
+            await self._send_compressed(frame, state)
+            return
+        if self.metrics is not None:
+            self.metrics.frame_sent(len(frame))
+        if isinstance(frame, str):
+            await self.send(text_data=frame)
+        else:
+            await self.send(bytes_data=frame)
+
+    async def _send_compressed(self, frame: str | bytes, state: ConnectionState):
+        data = frame.encode() if isinstance(frame, str) else frame
+        if state.compress_lock is None:
+            state.compress_lock = asyncio.Lock()
+        # a frame compressed but never sent would break the stream of every later frame for the client:
+        # cancelling the request (`CANCEL`, a timeout) doesn't stop the frame once it's handed over
+        await asyncio.shield(self._compress_and_send(data, state))
+
+    async def _compress_and_send(self, data: bytes, state: ConnectionState):
+        # frames are compressed as one stream, they must leave in the order they were compressed
+        async with state.compress_lock:
+            if len(data) >= state.compression.offload_threshold:
+                executor = self.executor(Execution.THREAD)
+                data = await asyncio.get_running_loop().run_in_executor(executor, state.compress, data)
+            else:
+                data = state.compress(data)
+            if self.metrics is not None:
+                self.metrics.frame_sent(len(data))
+            await self.send(bytes_data=data)
+
+    async def send_message(self, message: ResponseMessage | PreparedResponse | None, route: str | None = None):
+        """`route` labels the encode time of the response"""
+        if message is None:
+            return
+        if route is None or self.metrics is None:
+            await self.send_frame(self.codec.encode_message(message))
+            return
+        start = perf_counter()
+        frame = self.codec.encode_message(message)
+        self.metrics.phase(route, 'encode', perf_counter() - start)
+        await self.send_frame(frame)
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        frame = text_data if text_data is not None else bytes_data
+        if not frame:
+            return
+        if self.metrics is not None:
+            self.metrics.frame_received(len(frame))
+
+        # too large to be even decoded
+        limits = self.limits
+        if limits is not None and limits.frame_exceeds(len(frame)):
+            await self.send_message(too_large(self.codec.head_uuid(frame)))
+            return
+
+        if may_be_heartbeat(frame):
+            try:
+                content = self.codec.decode(frame)
+            except (ValueError, TypeError):
+                content = None
+            if is_heartbeat(content):
+                await self.send_frame(self.codec.pong(content['uuid']))
                 return
 
-            # find route
-            route_info: GenericRouteInfo | None = self._get_route(message.route)
-            if not route_info:
-                await self.send_json(
-                    message.error(error=set_error(CallError.RouteNotFound), status=StatusCodes.NOT_FOUND)
-                )
+        # answered right away, even while `max_in_flight` requests are running
+        if may_be_cancel(frame):
+            try:
+                content = self.codec.decode(frame)
+            except (ValueError, TypeError):
+                content = None
+            if is_cancel(content):
+                await self.send_message(self.cancel_request(content['uuid']))
+                return
+
+        # several requests in one frame
+        if self.codec.is_batch(frame):
+            try:
+                contents = self.codec.decode(frame)
+            except RecursionError:  # nested deeper than the parser goes
+                await self.send_message(too_large(self.codec.head_uuid(frame)))
                 return
+            except (ValueError, TypeError):
+                await self.send_message(ResponseMessage.bad_format())
+                return
+            await self._accept(self.route_batch(contents))
+            return
 
-            # find method
-            method_name = route_to_method_name(route_info.route)
+        # decoded first, to be checked against the limits or to build a slim envelope
+        if self.inspects_content:
             try:
-                main_handler = getattr(self, method_name)  # if the method doesn't exist, an exception will be raised
-            except AttributeError:
-                await self.send_json(
-                    message.error(status=StatusCodes.INTERNAL_SERVER_ERROR,
-                                  error=set_error(CallError.MethodNotImplemented))
-                )
+                content = self.codec.decode(frame)
+            except RecursionError:
+                await self.send_message(too_large(self.codec.head_uuid(frame)))
+                return
+            except (ValueError, TypeError):
+                await self.send_message(ResponseMessage.bad_format())
                 return
+            if is_cancel(content):
+                await self.send_message(self.cancel_request(content['uuid']))
+                return
+            await self._accept(self.route_content(content, len(frame)), content_uuid(content))
+            return
+
+        # validate the request straight from the frame
+        try:
+            message = self.codec.decode_request(frame)
+        except RecursionError:
+            await self.send_message(too_large(self.codec.head_uuid(frame)))
+            return
+        except (ValueError, TypeError):
+            await self.send_message(ResponseMessage.bad_format(self.codec.peek_uuid(frame)))
+            return
+
+        if message.route == CANCEL:
+            await self.send_message(self.cancel_request(message.uuid))
+            return
+        await self._accept(self.route_message(message), message.uuid)
+
+    async def receive_json(self, content, **kwargs):
+        if isinstance(content, list):
+            await self._accept(self.route_batch(content))
+            return
+
+        # only heart-bit checks, response, so the client makes sure the connection is open
+        if is_heartbeat(content):
+            await self.send_frame(self.codec.pong(content['uuid']))
+            return
+
+        if is_cancel(content):
+            await self.send_message(self.cancel_request(content['uuid']))
+            return
+        await self._accept(self.route_content(content), content_uuid(content))
+
+    async def _accept(self, work: Coroutine, uuid: str | int | None = None):
+        if self.concurrent_requests:
+            await self._spawn(work, uuid)
+        else:
+            await work
+
+    async def _spawn(self, work: Coroutine, uuid: str | int | None = None):
+        state = self.state
+        if state.in_flight is None:
+            state.in_flight = {}
+            state.in_flight_slots = asyncio.Semaphore(self.max_in_flight)
+
+        # backpressure without holding back the reading of the socket, heartbeats included
+        if len(state.in_flight) >= self.max_in_flight + self.max_queued:
+            work.close()
+            await self.send_message(ResponseMessage.service_unavailable('' if uuid is None else uuid, 1))
+            return
+
+        # the slot is taken by the task, so a request waiting for one can be cancelled too
+        task = asyncio.create_task(self._in_slot(state.in_flight_slots, work))
+        # a uuid already running can't be told apart, the newer request is kept by its task only
+        key = task if uuid is None or uuid == '' or uuid in state.in_flight else uuid
+        state.in_flight[key] = task
+        # the state may be dropped (on disconnect) before the task is done
+        task.add_done_callback(partial(self._request_done, state, key))
+
+    @staticmethod
+    async def _in_slot(slots: asyncio.Semaphore, work: Coroutine):
+        """runs a request once one of the connection's `max_in_flight` slots is free"""
+        try:
+            async with slots:
+                await work
+        finally:
+            work.close()  # never started when cancelled while waiting
+
+    @staticmethod
+    def _request_done(state: ConnectionState, key: Hashable, task: asyncio.Task):
+        del state.in_flight[key]
+
+    def cancel_request(self, uuid: str | int) -> ResponseMessage:
+        """
+            cancels the running (or waiting, see `max_in_flight`) request with this uuid, its response is never sent.
+            requests only run concurrently to a `CANCEL` message when `concurrent_requests` is enabled.
+        """
+        in_flight = self._state.in_flight if self._state is not None else None
+        task = in_flight.get(uuid) if in_flight else None
+        if task is not None:
+            task.cancel()
+        return ResponseMessage(uuid=uuid, status=StatusCodes.NO_CONTENT)
+
+    async def throttle(self, limit: RateLimit) -> float:
+        """takes a token of `limit` for the current request, returns 0 if it may run, otherwise the seconds to wait"""
+        if limit.per_connection:
+            return self._take_token(limit)
+        key = limit.identify(self.scope)
+        return 0 if key is None else await limit.backend.atake(key, limit.rate, limit.capacity)
+
+    async def add_subscription(self, uuid: str | int, group: str):
+        state = self.state
+        if state.subscriptions is None:
+            state.subscriptions = Subscriptions()
+        joined, left = state.subscriptions.add(uuid, group)
+        if left:
+            await self.channel_layer.group_discard(left, self.channel_name)
+        if joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+
+    async def remove_subscription(self, uuid: str | int):
+        state = self._state
+        if state is None:
+            return
+        group = state.subscriptions.remove(uuid) if state.subscriptions else None
+        if state.deltas is not None:
+            state.deltas.discard((SUBSCRIPTION, uuid))
+        if group:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def observable_push(self, event):
+        """channel-layer handler of published updates, see `apublish`"""
+        if self._state is None or not self._state.subscriptions:
+            return
+        for response in self.push_responses(event):
+            await self.send_message(response)
+
+    async def observable_forget_checks(self, event):
+        """channel-layer handler of `FORGET_CHECKS` events"""
+        self.forget_checks(event.get('route'))
+
+    async def _call(self, entry: RouteEntry, hook: str, method, is_async: bool, *args):
+        """runs a hook of the route according to its execution policy, timed when `metrics` is set"""
+        metrics = self.metrics
+        start = perf_counter() if metrics is not None else 0
+        try:
+            if is_async:
+                return await method(*args)
+
+            execution = entry.executions.get(hook)
+            if execution is None:
+                return method(*args)
+
+            result, queued, running = await run_in_executor(self.executor(execution), method, args)
+            self.record_execution(entry.route, hook, queued, running)
+            return result
+        finally:
+            if metrics is not None:
+                metrics.phase(entry.route, hook, perf_counter() - start)
+
+    async def _check(self, entry: RouteEntry, hook: str, method, is_async: bool, arg):
+        """runs a check of the route, or recalls its result when the route has `memoize`"""
+        key, result = self.recall_check(entry, hook, arg)
+        if result is None:
+            if key is None:
+                return await self._call(entry, hook, method, is_async, arg)
+            before = dict(arg.store)
+            result = await self._call(entry, hook, method, is_async, arg)
+            self.remember_check(entry, key, result, store_writes(before, arg.store))
+        return result
+
+    @classmethod
+    def executor(cls, execution: Execution) -> Executor:
+        """the worker's pool of `execution`, of `thread_pool_size` or `process_pool_size` workers"""
+        size = cls.process_pool_size if execution is Execution.PROCESS else cls.thread_pool_size
+        return get_executor(execution, size)
+
+    @classmethod
+    async def adehydrate_update(cls, entry: RouteEntry, data: Any) -> Any:
+        """runs the sync dehydrate function of a published update like the one of a response, see `execution`"""
+        execution = entry.executions.get('dehydrate')
+        if execution is None:
+            return entry.dehydrate(data)
+        result, _, _ = await run_in_executor(cls.executor(execution), entry.dehydrate, (data,))
+        return result
+
+    def record_execution(self, route: str, hook: str, queued: float, running: float):
+        """
+            called with the seconds an offloaded hook waited for a pool worker and ran in it, passed on to `metrics`.
+            override it to collect them elsewhere
+        """
+        if self.metrics is not None:
+            self.metrics.execution(route, hook, queued, running)
+
+    def _batcher(self, entry: RouteEntry) -> HydrateBatcher:
+        execution = entry.executions.get('hydrate')
+        executor = self.executor(execution) if execution is not None else None
+        if entry.info.batch_per_worker:
+            return worker_batcher((type(self), entry.route), entry, executor)
+
+        state = self.state
+        if state.batchers is None:
+            state.batchers = {}
+        batcher = state.batchers.get(entry.route)
+        if batcher is None:
+            batcher = state.batchers[entry.route] = HydrateBatcher.for_route(entry, executor)
+        return batcher
+
+    async def route_batch(self, contents: List[Any]):
+        """runs the requests of a batch concurrently and answers them all in one frame"""
+        size = self.max_batch_size
+        if self.observed:
+            work = (self._observe(content.get('route') if isinstance(content, dict) else None, content_uuid(content),
+                                  self.handle_content(content), send=False) for content in contents[:size])
+        else:
+            work = (self.handle_content(content) for content in contents[:size])
+        responses = await asyncio.gather(*work)
+        responses = [response for response in responses if response is not None]
+        # a batch is answered in one frame, streams included
+        for i, response in enumerate(responses):
+            if isinstance(response, StreamedResponse):
+                try:
+                    responses[i] = await response.acollect()
+                except Exception:
+                    logger.exception('streaming the response of request %r failed', response.uuid)
+                    responses[i] = ResponseMessage(uuid=response.uuid, status=StatusCodes.INTERNAL_SERVER_ERROR,
+                                                   payload=set_error(CallError.InternalServerError))
+        responses.extend(ResponseMessage.batch_too_large(content_uuid(content)) for content in contents[size:])
+        start = perf_counter()
+        frame = self.codec.encode_messages(responses)
+        if self.metrics is not None:
+            self.metrics.phase(BATCH, 'encode', perf_counter() - start)
+        await self.send_frame(frame)
+
+    async def handle_content(self, content: Any, size: int = 0) \
+            -> BaseModel | PreparedResponse | StreamedResponse | None:
+        """pipeline of a single, already decoded, request, `size` is the length of its frame (0 inside a batch)"""
+        if is_heartbeat(content):
+            return RequestMessage(route=PONG, uuid=content['uuid'])
+
+        if self.content_exceeds_limits(content, size):
+            return too_large(content_uuid(content))
+
+        try:
+            message = self.parse_request(content)
+        except ValueError:
+            return ResponseMessage.bad_format(content_uuid(content))
+
+        return await self.handle_message(message)
+
+    async def route_content(self, content: Any, size: int = 0):
+        if self.observed:
+            route = content.get('route') if isinstance(content, dict) else None
+            await self._observe(route, content_uuid(content), self.handle_content(content, size))
+        else:
+            await self.send_response(await self.handle_content(content, size))
+
+    async def route_message(self, message: RequestMessage | SlimRequest):
+        if self.observed:
+            await self._observe(message.route, message.uuid, self.handle_message(message))
+        else:
+            await self.send_response(await self.handle_message(message))
+
+    async def _observe(self, route: Any, uuid: str | int, work: Coroutine, send: bool = True):
+        """runs (and sends) a request measured by `metrics` and traced by `tracer`"""
+        route = self.metric_route(route)
+        metrics = self.metrics or _NO_METRICS
+        tracer = self.tracer
+        span = tracer.start_as_current_span(route, attributes={'socket.route': route, 'socket.uuid': uuid}) \
+            if tracer is not None else nullcontext()
+        status = None
+        metrics.request_started(route)
+        start = perf_counter()
+        try:
+            with span as current:
+                response = await work
+                if send:
+                    await self.send_response(response, route)
+                status = getattr(response, 'status', StatusCodes.OK) if response is not None else None
+                if current is not None and status is not None:
+                    current.set_attribute('socket.status', status)
+            return response
+        finally:
+            metrics.request_finished(route, status, perf_counter() - start)
+
+    async def send_response(self, response: BaseModel | PreparedResponse | StreamedResponse | None,
+                            route: str | None = None):
+        if isinstance(response, StreamedResponse):
+            await self.send_stream(response)
+        else:
+            await self.send_message(response, route)
+
+    async def send_stream(self, response: StreamedResponse):
+        count = 0
+        try:
+            async for chunk in response.achunks():
+                await self.send_message(response.chunk(count, chunk))
+                count += 1
+        except Exception:
+            logger.exception('streaming the response of request %r failed', response.uuid)
+            await self.send_message(response.failed(count))
+            return
+        await self.send_message(response.end(count))
+
+    async def handle_message(self, message: RequestMessage | SlimRequest) \
+            -> ResponseMessage | PreparedResponse | StreamedResponse | None:
+        """runs the whole pipeline of a request and returns its response"""
+        if message.route == UNSUBSCRIBE:
+            await self.remove_subscription(message.uuid)
+            return ResponseMessage(uuid=message.uuid, status=StatusCodes.NO_CONTENT)
+
+        if message.route == CANCEL:
+            return self.cancel_request(message.uuid)
+
+        if self.rate_limit is not None:
+            retry_after = await self.throttle(self.rate_limit)
+            if retry_after:
+                return ResponseMessage.too_many_requests(message.uuid, retry_after)
+
+        # find route
+        entry = self._dispatch.get(message.route)
+        if entry is None:
+            return message.build_error(error=set_error(CallError.RouteNotFound), status=StatusCodes.NOT_FOUND)
+
+        idempotency = entry.info.idempotency
+        if idempotency is not None:
+            key = idempotency.identify(self.scope, entry.route, message.uuid)
+            if key is not None:
+                return await self.replay(message, entry, key)
+        return await self.call_route(message, entry)
+
+    async def replay(self, message: RequestMessage | SlimRequest, entry: RouteEntry, key: str) \
+            -> ResponseMessage | PreparedResponse | StreamedResponse | None:
+        """answers a retried request with the response of the first one, which runs only once"""
+        idempotency = entry.info.idempotency
+        stored = await idempotency.store.aget(key)
+        if stored is not None:
+            return PreparedResponse(message.uuid, *stored)
+
+        # the same request is running already, from this connection or another one
+        pending = idempotency.pending.get(key)
+        if pending is not None:
+            stored = await asyncio.shield(pending)
+            if stored is not None:
+                return PreparedResponse(message.uuid, *stored)
+            return await self.call_route(message, entry)
+
+        pending = idempotency.pending[key] = asyncio.get_running_loop().create_future()
+        stored = None
+        try:
+            response = await self.call_route(message, entry)
+            stored = replayable(response)
+            if stored is not None:
+                await idempotency.store.aset(key, stored)
+            return response
+        finally:
+            del idempotency.pending[key]
+            pending.set_result(stored)
+
+    async def call_route(self, message: RequestMessage | SlimRequest, entry: RouteEntry) \
+            -> ResponseMessage | PreparedResponse | StreamedResponse | None:
+        """runs the route within its rate limit and timeout, once the `scheduler` admits it"""
+        rate_limit = entry.info.rate_limit
+        if rate_limit is not None:
+            retry_after = await self.throttle(rate_limit)
+            if retry_after:
+                return ResponseMessage.too_many_requests(message.uuid, retry_after)
+
+        scheduler = self.scheduler
+        if scheduler is None:
+            return await self.run_timed(message, entry)
+
+        lane = entry.info.lane
+        retry_after = scheduler.shed(lane)
+        if retry_after:
+            return ResponseMessage.service_unavailable(message.uuid, retry_after)
+        await scheduler.acquire(lane)
+        try:
+            return await self.run_timed(message, entry)
+        finally:
+            scheduler.release()
+
+    async def run_timed(self, message: RequestMessage | SlimRequest, entry: RouteEntry) \
+            -> ResponseMessage | PreparedResponse | StreamedResponse | None:
+        timeout = entry.info.timeout
+        if timeout is None:
+            return await self.run_route(message, entry)
+        try:
+            return await asyncio.wait_for(self.run_route(message, entry), timeout)
+        except asyncio.TimeoutError:  # not the builtin TimeoutError before Python 3.11
+            return message.build_error(status=StatusCodes.GATEWAY_TIMEOUT, error=set_error(CallError.Timeout))
+
+    async def run_route(self, message: RequestMessage | SlimRequest, entry: RouteEntry) \
+            -> ResponseMessage | PreparedResponse | StreamedResponse | None:
+        """runs the hooks and the handler of the route"""
+        try: # Handling any issues in user code
+            inner_data = self.handler_arg(message)
+
+            # check input data if such method is provided
+            check_data = entry.check_data
+            if check_data:
+                data_check = await self._check(entry, 'check_data', check_data, entry.check_data_is_async, inner_data)
+                if not data_check:
+                    return message.build_error(status=StatusCodes.BAD_REQUEST, error=set_error(CallError.InvalidData))
+
+            # check access permission if such method is provided
+            check_access = entry.check_access
+            if check_access:
+                access_checked = await self._check(entry, 'check_access', check_access, entry.check_access_is_async,
+                                                   inner_data)
+                if not access_checked:
+                    return message.build_error(error=set_error(CallError.AccessDenied), status=StatusCodes.FORBIDDEN)
+
+            # nothing to send if the client already has the current version
+            requested = requested_version(message.headers)
+            etag = None
+            version = entry.version
+            if version:
+                etag = await version(inner_data) if entry.version_is_async else version(inner_data)
+                if etag is not None:
+                    etag = str(etag)
+                    if etag == requested:
+                        return ResponseMessage.not_modified(message.uuid, etag)
+
+            # the resource whose last payload the response may be a patch of
+            delta = entry.info.delta
+            delta_key = (entry.route, delta.make_key(inner_data)) if delta is not None else None
+
+            # serve the cached response if there is one
+            cache = entry.info.cache
+            cache_key = cache.make_key(inner_data) if cache is not None else None
+            if cache_key is not None:
+                cached = await cache.aget(cache_key)
+                if cached is not None:
+                    cached_etag = cached[2].get(ETAG) if cached[2] else None
+                    if cached_etag is not None and cached_etag == requested:
+                        return ResponseMessage.not_modified(message.uuid, cached_etag)
+                    return PreparedResponse(message.uuid, *cached)
+
+            # hydrate the payload if the function is provided
+            hydrate = entry.hydrate
+            if hydrate:
+                inner_data.payload = await self._call(entry, 'hydrate', hydrate, entry.hydrate_is_async, inner_data)
+            elif entry.batch_hydrate:
+                inner_data.payload = await self._call(entry, 'hydrate', self._batcher(entry).load, True, inner_data)
+
+            # resolve the group to observe if the route is subscribable
+            group = None
+            subscribe = entry.subscribe
+            if subscribe:
+                group = await subscribe(inner_data) if entry.subscribe_is_async else subscribe(inner_data)
+
+            # run main handler
+            handler = entry.handler
+            result: SocketResult = await self._call(entry, 'handler', handler, entry.handler_is_async, self, inner_data)
+
+            # dehydrate if dehydrate is provided and main handler has returned 2xx status
+            dehydrate = entry.dehydrate
+            status = result.get('status', StatusCodes.OK)
+            is_successful = result_is_successful(status)
+            if dehydrate and is_successful:
+                payload = result.get('payload')
+                result['payload'] = await self._call(entry, 'dehydrate', dehydrate, entry.dehydrate_is_async, payload)
+
+            # join before responding, so no update published after the response gets lost
+            if group and is_successful:
+                await self.add_subscription(message.uuid, group)
+
+            # iterators are sent in chunks, as they're produced
+            if is_successful and is_stream(result.get('payload')):
+                return StreamedResponse(message.uuid, status, result['payload'], result.get('headers'),
+                                        entry.info.stream_chunk_size)
+
+            if is_successful and delta is not None:
+                return self.delta_response(message, delta_key, status, result, etag, bool(group))
+
+            if is_successful and (cache_key is not None or (etag is None and entry.info.etag)):
+                # from here on the payload is only needed encoded: to hash it, to cache it and to send it
+                encoded = encode_payload(result.get('payload'))
+                if etag is None and entry.info.etag:
+                    etag = content_version(encoded)
+                cached = (status, encoded, with_etag(result.get('headers'), etag) if etag else result.get('headers'))
+                if cache_key is not None:
+                    await cache.aset(cache_key, cached)
+                if etag is not None and etag == requested:
+                    return ResponseMessage.not_modified(message.uuid, etag)
+                return PreparedResponse(message.uuid, *cached)
+
+            if etag is not None and is_successful:
+                result['headers'] = with_etag(result.get('headers'), etag)
+
+            # return final result
+            return message.build_response(result)
 
-            try: # Handling any issues in user code
-                inner_data = HandlerArg(scope=self.scope, headers=message.headers, payload=message.payload, store=dict())
-
-                # check input data if such method is provided
-                check_data = route_info.check_data
-                if check_data:
-                    is_awaitable = inspect.iscoroutinefunction(check_data)
-                    data_check = await check_data(inner_data) if is_awaitable else check_data(inner_data)
-                    if not data_check:
-                        await self.send_json(
-                            message.error(status=StatusCodes.BAD_REQUEST, error=set_error(CallError.InvalidData))
-                        )
-                        return
-
-                # check access permission if such method is provided
-                check_access = route_info.check_access
-                if check_access:
-                    is_awaitable = inspect.iscoroutinefunction(check_access)
-                    access_checked = await check_access(inner_data) if is_awaitable else check_access(inner_data)
-                    if not access_checked:
-                        await self.send_json(
-                            message.error(error=set_error(CallError.AccessDenied), status=StatusCodes.FORBIDDEN)
-                        )
-                    return
-
-                # hydrate the payload if the function is provided
-                hydrate = route_info.hydrate
-                if hydrate:
-                    is_awaitable = inspect.iscoroutinefunction(hydrate)
-                    inner_data.payload = await hydrate(inner_data) if is_awaitable else hydrate(inner_data)
-
-                # run main handler
-                is_awaitable = inspect.iscoroutinefunction(main_handler)
-                result: SocketResult = await main_handler(inner_data) if is_awaitable else main_handler(inner_data)
-
-                # dehydrate if dehydrate is provided and main handler has returned 2xx status
-                dehydrate = route_info.dehydrate
-                should_dehydrate: bool = dehydrate and result_is_successful(result.get('status', StatusCodes.OK))
-                if should_dehydrate:
-                    is_awaitable = inspect.iscoroutinefunction(dehydrate)
-                    result['payload'] = await dehydrate(result.get('payload')) if is_awaitable else dehydrate(result.get('payload'))
-
-                # return final result
-                await self.send_json(message.respond(result))
-
-            except Exception as e:
-                logger.error(str(e))
-                await self.send_json(
-                    message.error(status=StatusCodes.INTERNAL_SERVER_ERROR,
-                                  error=set_error(CallError.InternalServerError))
-                )
-        except ValidationError:
-            response = {
-                'uuid': content.get('uuid', ''),
-                'status': StatusCodes.BAD_REQUEST,
-                'payload': set_error(CallError.BadRequestFormat)
-            }
-            await self.send_json(
-                ResponseMessage(**response).model_dump()
-            )
\ No newline at end of file
+        except Exception:
+            logger.exception('request %r to route %s failed', message.uuid, message.route)
+            return message.build_error(status=StatusCodes.INTERNAL_SERVER_ERROR,
+                                      error=set_error(CallError.InternalServerError))
@@ -1,5 +1,22 @@
-from .message import RequestMessage, ResponseMessage
+from .message import RequestMessage, ResponseMessage, PreparedResponse, encode_payload
 from .status import StatusCodes
 from .route_info import CheckMethod, HydrateMethod, DeHydrateMethod, RouteInfo, GenericRouteInfo
 from .base_router import BaseRouter, enforce_routes
 from .errors import CallError, set_error
+from .heartbeat import PING, PONG, CANCEL, is_heartbeat, may_be_heartbeat, is_cancel, may_be_cancel, pong_frame
+from .codec import Codec, JsonCodec, OrjsonCodec, MsgspecCodec, MsgpackCodec
+from .subscription import UNSUBSCRIBE, PUSH_EVENT, Subscriptions
+from .cache import ResponseCache, LocMemResponseCache, DjangoResponseCache
+from .conditional import IF_NONE_MATCH, ETAG
+from .execution import Execution, ExecutionPolicy
+from .stream import StreamedResponse, is_stream, CHUNK, CHUNKS
+from .rate_limit import RateLimit, RateLimitBackend, LocMemRateLimitBackend, DjangoRateLimitBackend, RETRY_AFTER
+from .limits import FrameLimits
+from .envelope import SlimRequest, SlimHandlerArg
+from .metrics import MetricsSink, CallbackMetrics, PrometheusMetrics, PHASES, UNKNOWN_ROUTE, BATCH
+from .compression import Compression, ZlibCompression, ZstdCompression, COMPRESSED_FRAME
+from .delta import Delta, DeltaStore, DELTA_BASE, json_diff
+from .memo import CheckMemo, FORGET_CHECKS
+from .replay import Idempotency
+from .scheduler import Lane, Scheduler
+from .state import ConnectionState
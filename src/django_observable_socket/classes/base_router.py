@@ -1,8 +1,32 @@
-from typing import Tuple
+import json
+import time
+from types import MappingProxyType
+from typing import Any, Hashable, List, Mapping, Tuple
+from urllib.parse import parse_qs
 
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
 from typing_extensions import ClassVar
 
+from .codec import Codec, JsonCodec
+from .conditional import ETAG, content_version, requested_version, with_etag
+from .delta import DELTA_BASE, SUBSCRIPTION, DeltaStore, encoded_patch
+from .compression import Compression
+from .envelope import SlimHandlerArg, SlimRequest
+from .limits import FrameLimits
+from .memo import CheckResults
+from .state import ConnectionState
+from .metrics import MetricsSink, UNKNOWN_ROUTE
+from .message import ResponseMessage, PreparedResponse, encode_payload
+from .status import StatusCodes
+from .rate_limit import RateLimit
+from .subscription import PUSH_EVENT, UNSUBSCRIBE
+from .heartbeat import CANCEL
+from ..tools import result_is_successful
+from .dispatch import DispatchTable, RouteEntry, build_dispatch_table
 from .route_info import is_route_info, GenericRouteInfo
+from .message import RequestMessage
+from .types import AuxiliaryStore, HandlerArg
 
 
 def enforce_routes(cls):
@@ -24,10 +48,274 @@ def enforce_routes(cls):
             routes[i] = GenericRouteInfo(**route_info)
 
     cls._routes = tuple(routes)
+    # resolve handlers and hooks once, so a missing `on_*` method fails here instead of at request time
+    cls._dispatch = build_dispatch_table(cls, cls._routes)
+    cls._route_limits = any(route_info.limits is not None for route_info in cls._routes)
+
+
+SUBPROTOCOL_PREFIX = 'observable-socket.'
 
 
 class BaseRouter:
     _routes: ClassVar[Tuple[GenericRouteInfo, ...]] = ()
+    _dispatch: ClassVar[DispatchTable] = MappingProxyType({})
+
+    codec: Codec = JsonCodec()
+    """
+        translates frames to messages and back, also used by `decode_json` and `encode_json`.
+        swap it for `OrjsonCodec()`, `MsgspecCodec()` or your own `Codec` subclass.
+    """
+
+    codecs: ClassVar[Mapping[str, Codec]] = {}
+    """
+        alternative codecs a client can choose at connect, by name, e.g. `{'msgpack': MsgpackCodec()}`.
+        the client asks for one either with the `observable-socket.<name>` subprotocol or a `?codec=<name>` query parameter,
+        otherwise `codec` is used.
+    """
+
+    compressions: ClassVar[Mapping[str, Compression]] = {}
+    """
+        compressions a client can ask for at connect with a `?compression=<name>` query parameter,
+        e.g. `{'deflate': ZlibCompression()}`. responses of the connection above the compression's `threshold`
+        are then sent as binary frames starting with `COMPRESSED_FRAME`, followed by the compressed response
+    """
+
+    max_batch_size: int = 50
+    """
+        most requests run from a single batch frame, the ones above it are answered with `PAYLOAD_TOO_LARGE`
+    """
+
+    rate_limit: RateLimit | None = None
+    """
+        limit of requests to any route, checked before the route's own `rate_limit`.
+        requests above it are answered with `TOO_MANY_REQUESTS` and a `Retry-After` header, see `RateLimit`
+    """
+
+    limits: FrameLimits | None = None
+    """
+        bounds of every incoming frame: its size, checked before it's decoded, and the depth and size of its payload
+        and its number of headers, checked before it's validated. frames above them are answered with `PAYLOAD_TOO_LARGE`.
+        routes may have their own `limits` on top of it, see `FrameLimits`
+    """
+
+    slim_envelopes: bool = False
+    """
+        use `SlimRequest` and `SlimHandlerArg` instead of pydantic models on the way of every request: only the
+        envelope (`uuid`, `route`, `headers`) is checked, the payload reaches the handler as decoded and the result
+        is encoded as is. handlers see the same attributes
+    """
+
+    metrics: MetricsSink | None = None
+    """
+        receives per-route counters and latencies, in-flight requests and frame sizes,
+        see `MetricsSink`, `CallbackMetrics` and `PrometheusMetrics`. nothing is measured while it's None
+    """
+
+    tracer: Any = None
+    """
+        an OpenTelemetry `Tracer` (or anything with its `start_as_current_span`), every request runs in its own span
+    """
+
+    delta_budget: int = 1 << 20
+    """
+        length of the encoded payloads a connection remembers for the routes with `delta`, the least recently used
+        are forgotten above it (and answered in full the next time)
+    """
+
+    memo_entries: int = 256
+    """
+        most check results a connection remembers for the routes with `memoize`, the least recently used are forgotten above it
+    """
+
+    _route_limits: ClassVar[bool] = False
+    _state: ConnectionState | None = None
+
+    @property
+    def state(self) -> ConnectionState:
+        """the connection's own state, created on first use"""
+        state = self._state
+        if state is None:
+            state = self._state = ConnectionState()
+        return state
+
+    def negotiate_compression(self):
+        """starts compressing the connection's responses if the client asked for one of the `compressions`"""
+        query_string = self.scope.get('query_string')
+        if not query_string or not self.compressions:
+            return
+        name = parse_qs(query_string.decode('latin-1')).get('compression', (None,))[0]
+        compression = self.compressions.get(name) if name else None
+        if compression is not None:
+            state = self.state
+            state.compression = compression
+            state.compress = compression.context()
+
+    @property
+    def inspects_content(self) -> bool:
+        """
+            whether frames are decoded first and validated after, to check them against `limits` or to build slim
+            envelopes, instead of being validated straight from the frame
+        """
+        return self.slim_envelopes or self._route_limits or (self.limits is not None and self.limits.inspects_content)
+
+    @property
+    def observed(self) -> bool:
+        return self.metrics is not None or self.tracer is not None
+
+    def metric_route(self, route: Any) -> str:
+        """route label of a request, the ones the consumer doesn't have share `UNKNOWN_ROUTE`"""
+        if route in self._dispatch or route == UNSUBSCRIBE or route == CANCEL:
+            return route
+        return UNKNOWN_ROUTE
+
+    def parse_request(self, content: Any) -> RequestMessage | SlimRequest:
+        """validates decoded content, raises ValueError if it's not a request"""
+        if self.slim_envelopes:
+            return SlimRequest.from_content(content)
+        return RequestMessage.model_validate(content)
+
+    def handler_arg(self, message: RequestMessage | SlimRequest) -> HandlerArg | SlimHandlerArg:
+        if self.slim_envelopes:
+            return SlimHandlerArg(self.scope, message.headers, message.payload, {})
+        # the message is validated already: no need to validate (and copy) its payload and the scope again.
+        # `arg.scope` is the connection's scope itself
+        return HandlerArg.model_construct(scope=self.scope, headers=message.headers, payload=message.payload, store={})
+
+    def content_exceeds_limits(self, content: Any, size: int = 0) -> bool:
+        """checks a decoded request against the consumer's and its route's `limits`"""
+        limits = self.limits
+        if limits is not None and limits.content_exceeds(content, size):
+            return True
+        if self._route_limits and isinstance(content, dict):
+            route = content.get('route')
+            entry = self._dispatch.get(route) if isinstance(route, str) else None
+            limits = entry.info.limits if entry is not None else None
+            if limits is not None and limits.content_exceeds(content, size):
+                return True
+        return False
+
+    def recall_check(self, entry: RouteEntry, hook: str, arg: HandlerArg) -> Tuple[Hashable | None, bool | None]:
+        """
+            key of the result of `hook` (`check_data` or `check_access`) for this request, None if it isn't memoized,
+            and the result remembered for it, None if it has to run. a remembered result comes with what the check
+            wrote to `arg.store`, written to it again
+        """
+        memo = entry.info.memoize
+        if memo is None or (hook == 'check_data' and not memo.data):
+            return None, None
+        key = memo.make_key(arg)
+        if key is None:
+            return None, None
+        key = (entry.route, hook, key)
+        checks = self._state.checks if self._state is not None else None
+        remembered = checks.get(key, memo) if checks is not None else None
+        if remembered is None:
+            return key, None
+        result, written = remembered
+        if written:
+            arg.store.update(written)
+        return key, result
+
+    def remember_check(self, entry: RouteEntry, key: Hashable, result: Any, written: AuxiliaryStore | None = None):
+        """`written` holds the entries of `arg.store` the check wrote, see `store_writes`"""
+        state = self.state
+        if state.checks is None:
+            state.checks = CheckResults(self.memo_entries)
+        state.checks.put(key, entry.info.memoize, bool(result), written)
+
+    def forget_checks(self, route: str | None = None):
+        """forgets the check results remembered by the connection, of every route or of `route`, e.g. on a role change"""
+        checks = self._state.checks if self._state is not None else None
+        if checks is not None:
+            checks.forget(route)
+
+    def delta_store(self) -> DeltaStore:
+        state = self.state
+        if state.deltas is None:
+            state.deltas = DeltaStore(self.delta_budget)
+        return state.deltas
+
+    def delta_response(self, message: RequestMessage | SlimRequest, key: Hashable, status: int, result: dict,
+                       etag: str | None = None, subscribed: bool = False) -> ResponseMessage | PreparedResponse:
+        """
+            answers with a patch of the payload the client has (see `DELTA_BASE`) when it's the one last sent for
+            `key` and the patch is smaller, otherwise with the whole payload. the payload is remembered for the next time
+        """
+        headers = result.get('headers')
+        payload = result.get('payload')
+        encoded = encode_payload(payload)
+        version = etag if etag is not None else content_version(encoded)
+
+        store = self.delta_store()
+        previous = store.get(key)
+        store.put(key, version, encoded)
+        if subscribed:
+            # updates pushed to the subscription are patches of this payload
+            store.put((SUBSCRIPTION, message.uuid), version, encoded)
+
+        base = message.headers.get(DELTA_BASE) if message.headers else None
+        if version == requested_version(message.headers) or (base is not None and version == str(base)):
+            return ResponseMessage.not_modified(message.uuid, version)
+        if previous is not None and base is not None and previous[0] == str(base):
+            patch = encoded_patch(previous[1], payload, encoded)
+            if patch is not None:
+                return PreparedResponse(message.uuid, status, patch, {**with_etag(headers, version), DELTA_BASE: base})
+        return PreparedResponse(message.uuid, status, encoded, with_etag(headers, version))
+
+    def push_responses(self, event: dict) -> List[PreparedResponse]:
+        """responses of the subscriptions of the connection to a published update, see `apublish`"""
+        uuids = self.state.subscriptions.subscribers(event['group'])
+        encoded = event['payload']
+        version = event.get('version')
+        if version is None:
+            return [PreparedResponse(uuid, event['status'], encoded) for uuid in uuids]
+
+        store = self.delta_store()
+        headers = {ETAG: version}
+        payload = None
+        responses = []
+        for uuid in uuids:
+            key = (SUBSCRIPTION, uuid)
+            previous = store.get(key)
+            store.put(key, version, encoded)
+            if previous is not None:
+                if payload is None:
+                    payload = json.loads(encoded)
+                patch = encoded_patch(previous[1], payload, encoded)
+                if patch is not None:
+                    responses.append(PreparedResponse(uuid, event['status'], patch, {**headers, DELTA_BASE: previous[0]}))
+                    continue
+            responses.append(PreparedResponse(uuid, event['status'], encoded, headers))
+        return responses
+
+    def _take_token(self, limit: RateLimit) -> float:
+        """takes a token from the connection's own bucket of `limit`"""
+        state = self.state
+        buckets = state.buckets
+        if buckets is None:
+            buckets = state.buckets = {}
+        bucket = buckets.get(limit)
+        if bucket is None:
+            bucket = buckets[limit] = limit.bucket()
+        return bucket.take(limit.rate, limit.capacity, time.monotonic())
+
+    def negotiate_codec(self) -> str | None:
+        """
+            picks the connection's codec from the handshake, returns the subprotocol to accept (if the choice was made by one)
+        """
+        for subprotocol in self.scope.get('subprotocols') or ():
+            if subprotocol.startswith(SUBPROTOCOL_PREFIX):
+                codec = self.codecs.get(subprotocol[len(SUBPROTOCOL_PREFIX):])
+                if codec is not None:
+                    self.codec = codec
+                    return subprotocol
+
+        query_string = self.scope.get('query_string')
+        if query_string and self.codecs:
+            name = parse_qs(query_string.decode('latin-1')).get('codec', (None,))[0]
+            if name in self.codecs:
+                self.codec = self.codecs[name]
+        return None
 
     @classmethod
     def routes(cls) -> Tuple[GenericRouteInfo, ...]:
@@ -36,7 +324,62 @@ class BaseRouter:
 
     @classmethod
     def _get_route(cls, path: str) -> GenericRouteInfo | None:
-        for i, route_info in enumerate(cls.routes()):
-            if route_info.route == path:
-                return route_info
-        return None
+        entry = cls._dispatch.get(path)
+        return entry.info if entry else None
+
+    @classmethod
+    def _get_entry(cls, path: str) -> RouteEntry | None:
+        return cls._dispatch.get(path)
+
+    @classmethod
+    async def apublish(cls, route: str, group: str, data: Any, status: int = StatusCodes.OK):
+        """
+            pushes `data` to every client subscribed to `group` (see `subscribe` of `GenericRouteInfo`).
+            `data` goes through the dehydrate function of `route` and is encoded once for the whole group,
+            every subscribed socket only wraps it in an envelope carrying its own request uuid.
+        """
+        entry = cls._published_entry(route)
+        payload = data
+        dehydrate = entry.dehydrate
+        if dehydrate and result_is_successful(status):
+            payload = await dehydrate(data) if entry.dehydrate_is_async else await cls.adehydrate_update(entry, data)
+        await get_channel_layer().group_send(group, cls._push_event(entry, group, payload, status))
+
+    @classmethod
+    def publish(cls, route: str, group: str, data: Any, status: int = StatusCodes.OK):
+        """
+            synchronous `apublish`, e.g. for model signal receivers: a sync dehydrate function runs in the calling thread,
+            so it may use the ORM
+        """
+        entry = cls._published_entry(route)
+        payload = data
+        dehydrate = entry.dehydrate
+        if dehydrate and result_is_successful(status):
+            payload = async_to_sync(dehydrate)(data) if entry.dehydrate_is_async else dehydrate(data)
+        async_to_sync(get_channel_layer().group_send)(group, cls._push_event(entry, group, payload, status))
+
+    @classmethod
+    async def adehydrate_update(cls, entry: RouteEntry, data: Any) -> Any:
+        """runs the sync dehydrate function of `entry` on an update published from async code, in a thread"""
+        return await sync_to_async(entry.dehydrate)(data)
+
+    @classmethod
+    def _published_entry(cls, route: str) -> RouteEntry:
+        entry = cls._dispatch.get(route)
+        if entry is None:
+            raise ValueError(f"{cls.__name__} has no `{route}` route")
+        return entry
+
+    @staticmethod
+    def _push_event(entry: RouteEntry, group: str, payload: Any, status: int) -> dict:
+        encoded = encode_payload(payload)
+        event = {
+            'type': PUSH_EVENT,
+            'group': group,
+            'status': status,
+            'payload': encoded,
+        }
+        if entry.info.delta is not None and result_is_successful(status):
+            # subscribers get a patch of the payload they have
+            event['version'] = content_version(encoded)
+        return event
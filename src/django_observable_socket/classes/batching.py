@@ -0,0 +1,88 @@
+import asyncio
+import weakref
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .dispatch import RouteEntry
+from .execution import run_in_executor
+from .types import HandlerArg
+
+
+class HydrateBatcher:
+    """
+        Coalesces the hydrate calls of concurrent requests of a route into calls of its `batch_hydrate`,
+        every waiting request gets its own item of the result.
+    """
+    __slots__ = ('_load', '_is_async', '_executor', '_window', '_max_size', '_pending', '_handle', '_running')
+
+    def __init__(self, load: Callable, is_async: bool, window: float = 0, max_size: int = 100,
+                 executor: Optional[Executor] = None):
+        self._load = load
+        self._is_async = is_async
+        self._executor = executor
+        """where a sync `load` runs, on the event loop when None"""
+        self._window = window
+        self._max_size = max_size
+        self._pending: List[Tuple[HandlerArg, asyncio.Future]] = []
+        self._handle: asyncio.Handle | None = None
+        self._running: set[asyncio.Task] = set()
+
+    @classmethod
+    def for_route(cls, entry: RouteEntry, executor: Optional[Executor] = None) -> 'HydrateBatcher':
+        """`executor` runs the route's sync `batch_hydrate`, see the `hydrate` execution of the route"""
+        info = entry.info
+        return cls(entry.batch_hydrate, entry.batch_hydrate_is_async, info.batch_window, info.batch_max_size, executor)
+
+    async def load(self, arg: HandlerArg) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((arg, future))
+
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._handle is None:
+            self._handle = loop.call_later(self._window, self._flush) if self._window else loop.call_soon(self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[HandlerArg, asyncio.Future]]):
+        args = [arg for arg, _ in batch]
+        try:
+            if self._is_async:
+                results = await self._load(args)
+            elif self._executor is not None:
+                results, _, _ = await run_in_executor(self._executor, self._load, (args,))
+            else:
+                results = self._load(args)
+            if len(results) != len(batch):
+                raise ValueError(f"batch_hydrate returned {len(results)} items for {len(batch)} requests")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # the request may have been cancelled meanwhile
+                future.set_result(result)
+
+
+_worker_batchers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def worker_batcher(key: Hashable, entry: RouteEntry, executor: Optional[Executor] = None) -> HydrateBatcher:
+    """the batcher shared by every connection served by the running event loop"""
+    batchers: Dict[Hashable, HydrateBatcher] = _worker_batchers.setdefault(asyncio.get_running_loop(), {})
+    batcher = batchers.get(key)
+    if batcher is None:
+        batcher = batchers[key] = HydrateBatcher.for_route(entry, executor)
+    return batcher
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+from .types import HandlerArg, Header
+
+CachedResponse = Tuple[int, str, Header]
+"""
+    status, JSON encoded payload (see `encode_payload`) and headers of a response
+"""
+
+CacheKeyMethod = Callable[[HandlerArg], Optional[Hashable]]
+
+
+class ResponseCache:
+    """
+        Cache of successful, dehydrated and encoded responses of a route. use one instance per route.
+
+        `key` maps a request (after `check_data` and `check_access`, before `hydrate`) to its cache key,
+        e.g. `lambda arg: arg.payload['id']`, include `arg.scope['user'].pk` when responses differ per user.
+        returning None skips the cache for that request.
+    """
+
+    def __init__(self, key: CacheKeyMethod, ttl: float = 60):
+        self.key = key
+        self.ttl = ttl
+
+    def make_key(self, arg: HandlerArg) -> Optional[Hashable]:
+        return self.key(arg)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, response: CachedResponse):
+        raise NotImplementedError
+
+    def invalidate(self, key: Hashable):
+        """drops the response stored for `key`, e.g. from a model signal receiver"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    async def aget(self, key: Hashable) -> Optional[CachedResponse]:
+        return self.get(key)
+
+    async def aset(self, key: Hashable, response: CachedResponse):
+        self.set(key, response)
+
+
+class LocMemResponseCache(ResponseCache):
+    """in-process cache, least recently used responses are evicted once `max_entries` are stored"""
+
+    def __init__(self, key: CacheKeyMethod, ttl: float = 60, max_entries: int = 1024):
+        super().__init__(key, ttl)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Tuple[float, CachedResponse]] = OrderedDict()
+        self._lock = threading.Lock()  # sync consumers are served from threads
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def set(self, key: Hashable, response: CachedResponse):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoResponseCache(ResponseCache):
+    """
+        cache backed by one of the project's `CACHES`, shared by all workers.
+        keys are turned into strings and prefixed by `key_prefix`, which has to be unique per route.
+        `clear` clears the whole cache alias, so give route caches their own alias if you need it.
+    """
+
+    def __init__(self, key: CacheKeyMethod, key_prefix: str, ttl: float = 60, alias: str = 'default'):
+        super().__init__(key, ttl)
+        self.key_prefix = key_prefix
+        self.alias = alias
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def _cache_key(self, key: Hashable) -> str:
+        return f'{self.key_prefix}:{key}'
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        return self.cache.get(self._cache_key(key))
+
+    def set(self, key: Hashable, response: CachedResponse):
+        self.cache.set(self._cache_key(key), response, timeout=self.ttl)
+
+    def invalidate(self, key: Hashable):
+        self.cache.delete(self._cache_key(key))
+
+    def clear(self):
+        self.cache.clear()
+
+    async def aget(self, key: Hashable) -> Optional[CachedResponse]:
+        return await self.cache.aget(self._cache_key(key))
+
+    async def aset(self, key: Hashable, response: CachedResponse):
+        await self.cache.aset(self._cache_key(key), response, timeout=self.ttl)
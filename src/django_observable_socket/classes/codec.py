@@ -0,0 +1,195 @@
+import json
+import re
+from functools import lru_cache
+from typing import Any, Iterable
+
+from pydantic import BaseModel
+
+from .heartbeat import PONG, pong_frame
+from .message import PreparedResponse, RequestMessage
+
+
+_JSON_ARRAY = re.compile(r'\s*\[')
+_JSON_ARRAY_BYTES = re.compile(rb'\s*\[')
+_JSON_UUID = re.compile(r'"uuid"\s*:\s*(?:"([^"\\]*)"|(-?\d+))')
+_HEAD = 256
+
+
+def content_uuid(content: Any) -> str | int:
+    uuid = content.get('uuid', '') if isinstance(content, dict) else ''
+    return uuid if isinstance(uuid, (str, int)) and not isinstance(uuid, bool) else ''
+
+
+class Codec:
+    """
+        Translates between websocket frames and messages, subclasses implement at least `decode` and `encode`.
+        `decode` and `encode` back the consumer's `decode_json` and `encode_json`, while `decode_request` and
+        `encode_message` turn a raw frame into a validated `RequestMessage` and a response model into a frame directly.
+        responses are `ResponseMessage` models or anything dumping like them, such as `PreparedResponse`.
+    """
+
+    def decode(self, data: str | bytes) -> Any:
+        raise NotImplementedError
+
+    def encode(self, content: Any) -> str | bytes:
+        raise NotImplementedError
+
+    def decode_request(self, data: str | bytes) -> RequestMessage:
+        return RequestMessage.model_validate(self.decode(data))
+
+    def encode_message(self, message: BaseModel) -> str | bytes:
+        return self.encode(message.model_dump())
+
+    def encode_messages(self, messages: Iterable[BaseModel]) -> str | bytes:
+        """a single frame holding the responses of a batch"""
+        return self.encode([message.model_dump() for message in messages])
+
+    def is_batch(self, frame: str | bytes) -> bool:
+        """
+            whether the frame holds a list of requests instead of a single one. this one decodes the frame,
+            override it with a check of its first bytes, like `JsonCodec` and `MsgpackCodec` do
+        """
+        try:
+            return isinstance(self.decode(frame), list)
+        except (ValueError, TypeError, RecursionError):
+            return False
+
+    def pong(self, uuid: str | int) -> str | bytes:
+        return self.encode({'headers': None, 'payload': None, 'uuid': uuid, 'route': PONG})
+
+    def peek_uuid(self, data: str | bytes) -> str | int:
+        """best effort lookup of the uuid of a frame which failed validation, so the error can still be tracked"""
+        try:
+            content = self.decode(data)
+        except (ValueError, TypeError, RecursionError):
+            return ''
+        return content_uuid(content)
+
+    def head_uuid(self, data: str | bytes) -> str | int:
+        """uuid of a frame which is too large to be decoded, if it can be spotted in its first bytes"""
+        return ''
+
+
+class JsonCodec(Codec):
+    """
+        The default codec: the standard library json module for arbitrary content, pydantic's own json parser and
+        serializer for messages, so a request is validated straight from the frame and a response is dumped straight
+        to text, without an intermediate dictionary.
+    """
+
+    def decode(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+    def encode(self, content: Any) -> str:
+        return json.dumps(content)
+
+    def decode_request(self, data: str | bytes) -> RequestMessage:
+        return RequestMessage.model_validate_json(data)
+
+    def encode_message(self, message: BaseModel) -> str:
+        return message.model_dump_json()
+
+    def encode_messages(self, messages: Iterable[BaseModel]) -> str:
+        return '[' + ','.join(message.model_dump_json() for message in messages) + ']'
+
+    def is_batch(self, frame: str | bytes) -> bool:
+        return (_JSON_ARRAY if isinstance(frame, str) else _JSON_ARRAY_BYTES).match(frame) is not None
+
+    def pong(self, uuid: str | int) -> str:
+        return pong_frame(uuid)
+
+    def head_uuid(self, data: str | bytes) -> str | int:
+        head = data[:_HEAD]
+        match = _JSON_UUID.search(head if isinstance(head, str) else head.decode('utf-8', 'ignore'))
+        if match is None:
+            return ''
+        return match.group(1) if match.group(1) is not None else int(match.group(2))
+
+
+class OrjsonCodec(JsonCodec):
+    """JsonCodec using orjson (`pip install orjson`) for arbitrary content"""
+
+    def __init__(self, option: int | None = None):
+        try:
+            import orjson
+        except ImportError as e:
+            raise ImportError("OrjsonCodec requires orjson, install it with `pip install orjson`") from e
+        self._orjson = orjson
+        self.option = option
+
+    def decode(self, data: str | bytes) -> Any:
+        return self._orjson.loads(data)
+
+    def encode(self, content: Any) -> str:
+        return self._orjson.dumps(content, option=self.option).decode()
+
+
+class MsgspecCodec(JsonCodec):
+    """JsonCodec using msgspec (`pip install msgspec`) for arbitrary content"""
+
+    def __init__(self):
+        try:
+            import msgspec
+        except ImportError as e:
+            raise ImportError("MsgspecCodec requires msgspec, install it with `pip install msgspec`") from e
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def decode(self, data: str | bytes) -> Any:
+        return self._decoder.decode(data)
+
+    def encode(self, content: Any) -> str:
+        return self._encoder.encode(content).decode()
+
+
+class MsgpackCodec(Codec):
+    """
+        Binary codec sending messages as MessagePack (`pip install msgpack`) in binary frames,
+        the message envelopes are the same as in JSON mode.
+
+        the JSON payload of a `PreparedResponse` (a published update, a cached response) is converted once and
+        spliced into the envelope of every socket it's sent to, the last `payload_cache` conversions are kept.
+    """
+
+    def __init__(self, payload_cache: int = 32):
+        try:
+            import msgpack
+        except ImportError as e:
+            raise ImportError("MsgpackCodec requires msgpack, install it with `pip install msgpack`") from e
+        self._packb = msgpack.packb
+        self._unpackb = msgpack.unpackb
+        self._array_header = msgpack.Packer().pack_array_header
+        # everything but the uuid of a PONG is known upfront
+        self._pong_head = self.encode({'headers': None, 'payload': None, 'uuid': None})[:-1]
+        self._pong_tail = self.encode('route') + self.encode(PONG)
+        self._keys = tuple(self.encode(key) for key in ('headers', 'payload', 'uuid', 'status'))
+        self._packed_payload = lru_cache(maxsize=payload_cache)(self._pack_json)
+
+    def decode(self, data: str | bytes) -> Any:
+        return self._unpackb(data, raw=False)
+
+    def encode(self, content: Any) -> bytes:
+        return self._packb(content)
+
+    def encode_message(self, message: BaseModel | PreparedResponse) -> bytes:
+        if not isinstance(message, PreparedResponse):
+            return self.encode(message.model_dump())
+        headers, payload, uuid, status = self._keys
+        # a map header for 4 entries, in the order of `ResponseMessage`
+        return b''.join((b'\x84', headers, self.encode(message.headers), payload, self._packed_payload(message.payload),
+                         uuid, self.encode(message.uuid), status, self.encode(message.status)))
+
+    def encode_messages(self, messages: Iterable[BaseModel | PreparedResponse]) -> bytes:
+        frames = [self.encode_message(message) for message in messages]
+        return self._array_header(len(frames)) + b''.join(frames)
+
+    def is_batch(self, frame: str | bytes) -> bool:
+        # fixarray, array 16 or array 32
+        return isinstance(frame, bytes) and (0x90 <= frame[0] <= 0x9f or frame[0] in (0xdc, 0xdd))
+
+    def pong(self, uuid: str | int) -> bytes:
+        # a map header for 4 entries instead of 3, the known entries, and the uuid
+        return b'\x84' + self._pong_head[1:] + self.encode(uuid) + self._pong_tail
+
+    def _pack_json(self, payload: str) -> bytes:
+        return self._packb(json.loads(payload))
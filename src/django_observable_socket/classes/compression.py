@@ -0,0 +1,82 @@
+import zlib
+from typing import Callable, Optional
+
+COMPRESSED_FRAME = b'\x00'
+"""
+    first byte of every compressed frame, a JSON or MessagePack frame never starts with it
+"""
+
+
+class CompressionContext:
+    """
+        Compression state of a single connection. frames are compressed as one stream, so keys repeated from frame to
+        frame are cheap, the client has to decompress them in order, with a single context as well.
+    """
+    __slots__ = ('_compress', '_flush')
+
+    def __init__(self, compress: Callable[[bytes], bytes], flush: Callable[[], bytes]):
+        self._compress = compress
+        self._flush = flush
+
+    def __call__(self, data: bytes) -> bytes:
+        return b''.join((COMPRESSED_FRAME, self._compress(data), self._flush()))
+
+
+class Compression:
+    """
+        Compression of outgoing frames, shared by the connections asking for it (see the consumers' `compressions`).
+        frames shorter than `threshold` are sent as they are, frames of `offload_threshold` and more are compressed
+        in the thread pool by the async consumer instead of on the event loop.
+    """
+
+    def __init__(self, threshold: int = 1024, offload_threshold: int = 256 * 1024):
+        self.threshold = threshold
+        self.offload_threshold = offload_threshold
+
+    def context(self) -> CompressionContext:
+        """a new compression stream, for a new connection"""
+        raise NotImplementedError
+
+
+class ZlibCompression(Compression):
+    """
+        Raw deflate streams, as in permessage-deflate: every frame ends with a sync flush (`00 00 ff ff`).
+        a stream holds about `2 ** (window_bits + 2) + 2 ** (mem_level + 9)` bytes, 256KiB by default, per connection.
+        `zdict` is a dictionary of strings expected in the frames (like the keys of dehydrated rows), the client needs it too.
+    """
+
+    def __init__(self, level: int = 6, threshold: int = 1024, offload_threshold: int = 256 * 1024,
+                 window_bits: int = 15, mem_level: int = 8, zdict: Optional[bytes] = None):
+        super().__init__(threshold, offload_threshold)
+        self.level = level
+        self.window_bits = window_bits
+        self.mem_level = mem_level
+        self.zdict = zdict
+
+    def context(self) -> CompressionContext:
+        options = {'zdict': self.zdict} if self.zdict else {}
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -self.window_bits, self.mem_level, **options)
+        return CompressionContext(compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH))
+
+
+class ZstdCompression(Compression):
+    """
+        Zstandard streams (`pip install zstandard`), every frame ends with a flushed block.
+        `dict_data` is a trained dictionary (see `zstandard.train_dictionary`), the client needs it too.
+    """
+
+    def __init__(self, level: int = 3, threshold: int = 1024, offload_threshold: int = 256 * 1024,
+                 dict_data: Optional[bytes] = None):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("ZstdCompression requires zstandard, install it with `pip install zstandard`") from e
+        super().__init__(threshold, offload_threshold)
+        self._zstandard = zstandard
+        self.level = level
+        self.dict_data = zstandard.ZstdCompressionDict(dict_data) if dict_data else None
+
+    def context(self) -> CompressionContext:
+        zstandard = self._zstandard
+        compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self.dict_data).compressobj()
+        return CompressionContext(compressor.compress, lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
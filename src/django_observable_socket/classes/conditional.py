@@ -0,0 +1,28 @@
+from hashlib import blake2b
+from typing import Any, Dict
+
+from .types import Header
+
+IF_NONE_MATCH = 'If-None-Match'
+"""
+    request header carrying the version (ETag) of the payload the client already has
+"""
+
+ETAG = 'ETag'
+"""
+    response header carrying the version of the payload
+"""
+
+
+def requested_version(headers: Header) -> str | None:
+    version = headers.get(IF_NONE_MATCH) if headers else None
+    return None if version is None else str(version)
+
+
+def content_version(encoded_payload: str) -> str:
+    """version of a payload derived from its content, see `encode_payload`"""
+    return blake2b(encoded_payload.encode(), digest_size=12).hexdigest()
+
+
+def with_etag(headers: Header, etag: str) -> Dict[str, Any]:
+    return {**headers, ETAG: etag} if headers else {ETAG: etag}
@@ -0,0 +1,118 @@
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .message import encode_payload
+from .types import HandlerArg
+
+DELTA_BASE = 'Delta-Base'
+"""
+    request header carrying the version (ETag) of the payload the client has, to be answered with a patch of it.
+    on a response, the version its payload is a patch of; a response without it carries the whole payload.
+"""
+
+SUBSCRIPTION = 'subscription'
+"""
+    first part of the delta store key of a subscription, the second is the uuid of the subscribing request
+"""
+
+Patch = List[Dict[str, Any]]
+
+
+def _pointer(path: str, key: str | int) -> str:
+    key = str(key)
+    if '~' in key or '/' in key:
+        key = key.replace('~', '~0').replace('/', '~1')
+    return f'{path}/{key}'
+
+
+def json_diff(old: Any, new: Any, path: str = '', patch: Optional[Patch] = None) -> Patch:
+    """
+        JSON Patch (RFC 6902) turning `old` into `new`, made of `add`, `remove` and `replace` operations.
+        lists are compared index by index, so an item inserted at the start replaces everything after it.
+    """
+    if patch is None:
+        patch = []
+    if old == new and type(old) is type(new):
+        return patch
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                patch.append({'op': 'remove', 'path': _pointer(path, key)})
+        for key, value in new.items():
+            if key in old:
+                json_diff(old[key], value, _pointer(path, key), patch)
+            else:
+                patch.append({'op': 'add', 'path': _pointer(path, key), 'value': value})
+    elif isinstance(old, list) and isinstance(new, list):
+        common = min(len(old), len(new))
+        for index in range(common):
+            json_diff(old[index], new[index], f'{path}/{index}', patch)
+        for index in range(len(old) - 1, common - 1, -1):
+            patch.append({'op': 'remove', 'path': f'{path}/{index}'})
+        for index in range(common, len(new)):
+            patch.append({'op': 'add', 'path': f'{path}/{index}', 'value': new[index]})
+    else:
+        patch.append({'op': 'replace', 'path': path, 'value': new})
+    return patch
+
+
+def encoded_patch(previous: str, payload: Any, encoded: str) -> Optional[str]:
+    """
+        encoded patch from the `previous` encoded payload to `payload` (encoded as `encoded`),
+        None if it isn't smaller than the payload itself
+    """
+    patch = encode_payload(json_diff(json.loads(previous), payload))
+    return patch if len(patch) < len(encoded) else None
+
+
+class Delta:
+    """
+        Makes a route answer with patches of the payload the client already has, see `DELTA_BASE`.
+
+        `key` maps a request (after `check_data` and `check_access`, before `hydrate`) to the resource it reads,
+        e.g. `lambda arg: arg.payload['id']`, every (route, key) of a connection remembers the last payload it was sent.
+        without `key`, the route has a single payload per connection.
+    """
+
+    def __init__(self, key: Optional[Callable[[HandlerArg], Optional[Hashable]]] = None):
+        self.key = key
+
+    def make_key(self, arg: HandlerArg) -> Optional[Hashable]:
+        return self.key(arg) if self.key is not None else None
+
+
+class DeltaStore:
+    """
+        Last payloads sent to a connection, encoded, by (route, key). the least recently used ones are dropped
+        once their total length exceeds `budget`.
+    """
+    __slots__ = ('budget', 'size', '_entries')
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.size = 0
+        self._entries: OrderedDict[Hashable, Tuple[str, str]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, str]]:
+        """version and encoded payload last sent for `key`"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, version: str, encoded: str):
+        self.discard(key)
+        if len(encoded) > self.budget:
+            return
+        self._entries[key] = (version, encoded)
+        self.size += len(encoded)
+        while self.size > self.budget:
+            _, (_, dropped) = self._entries.popitem(last=False)
+            self.size -= len(dropped)
+
+    def discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
@@ -0,0 +1,119 @@
+import inspect
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from .execution import Execution, resolve_policy
+from .route_info import GenericRouteInfo
+from ..tools import route_to_method_name
+
+
+def _is_async(method: Optional[Callable]) -> bool:
+    return method is not None and inspect.iscoroutinefunction(method)
+
+
+class RouteEntry(BaseModel):
+    """
+        Everything needed to serve a route, resolved once when the consumer class is defined,
+        so dispatching a message is a single dictionary lookup.
+    """
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    info: GenericRouteInfo
+    method_name: str
+
+    executions: Mapping[str, Execution] = {}
+    """
+        the hooks which don't run on the event loop of the async consumer (see `Execution`)
+    """
+
+    handler: Callable[..., Any]
+    """
+        the consumer method (unbound function) serving the route, called as `handler(consumer, handler_arg)`
+    """
+    handler_is_async: bool = False
+
+    check_data: Optional[Callable[..., Any]] = None
+    check_data_is_async: bool = False
+
+    check_access: Optional[Callable[..., Any]] = None
+    check_access_is_async: bool = False
+
+    hydrate: Optional[Callable[..., Any]] = None
+    hydrate_is_async: bool = False
+
+    batch_hydrate: Optional[Callable[..., Any]] = None
+    batch_hydrate_is_async: bool = False
+
+    dehydrate: Optional[Callable[..., Any]] = None
+    dehydrate_is_async: bool = False
+
+    version: Optional[Callable[..., Any]] = None
+    version_is_async: bool = False
+
+    subscribe: Optional[Callable[..., Any]] = None
+    subscribe_is_async: bool = False
+
+    @property
+    def route(self) -> str:
+        return self.info.route
+
+    @classmethod
+    def resolve(cls, owner: type, route_info: GenericRouteInfo) -> 'RouteEntry':
+        method_name = route_to_method_name(route_info.route)
+        handler = getattr(owner, method_name, None)
+        if not callable(handler):
+            raise TypeError(
+                f"{owner.__name__} must implement `{method_name}` to serve the `{route_info.route}` route"
+            )
+
+        if route_info.hydrate and route_info.batch_hydrate:
+            raise TypeError(f"`{route_info.route}` route of {owner.__name__} can't have both hydrate and batch_hydrate")
+        if route_info.cache and route_info.delta:
+            raise TypeError(f"`{route_info.route}` route of {owner.__name__} answers with patches and can't be cached")
+        if route_info.cache and route_info.subscribe:
+            raise TypeError(f"`{route_info.route}` route of {owner.__name__} is observable and can't be cached")
+
+        policy = resolve_policy(owner.__name__, route_info.route, getattr(owner, 'execution', None), route_info.execution)
+        # coroutine functions always run on the event loop
+        hooks = {'handler': handler, **{hook: getattr(route_info, hook) for hook in policy if hook != 'handler'}}
+        if 'hydrate' in hooks and route_info.batch_hydrate:
+            # the policy of `hydrate` applies to `batch_hydrate`, see `HydrateBatcher`
+            hooks['hydrate'] = route_info.batch_hydrate
+        executions = {hook: execution for hook, execution in policy.items()
+                      if hooks[hook] is not None and not _is_async(hooks[hook])}
+
+        return cls(
+            info=route_info,
+            method_name=method_name,
+            executions=MappingProxyType(executions),
+            handler=handler,
+            handler_is_async=_is_async(handler),
+            check_data=route_info.check_data,
+            check_data_is_async=_is_async(route_info.check_data),
+            check_access=route_info.check_access,
+            check_access_is_async=_is_async(route_info.check_access),
+            hydrate=route_info.hydrate,
+            hydrate_is_async=_is_async(route_info.hydrate),
+            batch_hydrate=route_info.batch_hydrate,
+            batch_hydrate_is_async=_is_async(route_info.batch_hydrate),
+            dehydrate=route_info.dehydrate,
+            dehydrate_is_async=_is_async(route_info.dehydrate),
+            version=route_info.version,
+            version_is_async=_is_async(route_info.version),
+            subscribe=route_info.subscribe,
+            subscribe_is_async=_is_async(route_info.subscribe),
+        )
+
+
+DispatchTable = Mapping[str, RouteEntry]
+
+
+def build_dispatch_table(owner: type, routes: Iterable[GenericRouteInfo]) -> DispatchTable:
+    table = {}
+    for route_info in routes:
+        if route_info.route in table:
+            raise TypeError(f"{owner.__name__}._routes defines `{route_info.route}` more than once")
+        table[route_info.route] = RouteEntry.resolve(owner, route_info)
+    return MappingProxyType(table)
@@ -0,0 +1,71 @@
+from typing import Any
+
+from pydantic_core import to_json
+
+from .errors import Error
+from .message import PreparedResponse, encode_payload
+from .status import StatusCodes
+from .types import AuxiliaryStore, Header, SocketResult
+
+_NULL = 'null'
+
+
+class SlimRequest:
+    """
+        A `RequestMessage` without pydantic: only `uuid`, `route` and `headers` are checked, `payload` is passed
+        through as decoded. responses are built as `PreparedResponse`, encoded right away.
+        used instead of `RequestMessage` when the consumer's `slim_envelopes` is enabled.
+    """
+    __slots__ = ('uuid', 'route', 'headers', 'payload')
+
+    def __init__(self, uuid: str | int, route: str, headers: Header = None, payload: Any = None):
+        self.uuid = uuid
+        self.route = route
+        self.headers = headers
+        self.payload = payload
+
+    @classmethod
+    def from_content(cls, content: Any) -> 'SlimRequest':
+        """raises ValueError if the decoded content isn't a request"""
+        if type(content) is not dict:
+            raise ValueError('a request must be an object')
+        uuid = content.get('uuid')
+        if type(uuid) is not str and type(uuid) is not int:
+            raise ValueError('uuid of a request must be a string or an integer')
+        route = content.get('route')
+        if type(route) is not str:
+            raise ValueError('route of a request must be a string')
+        headers = content.get('headers')
+        if headers is not None and type(headers) is not dict:
+            raise ValueError('headers of a request must be an object')
+        return cls(uuid, route, headers, content.get('payload'))
+
+    def build_response(self, result: SocketResult) -> PreparedResponse:
+        status = result.get('status', StatusCodes.OK)
+        headers = result.get('headers')
+        try:
+            if type(status) is not int:
+                raise TypeError('status of a result must be an integer')
+            if headers:
+                to_json(headers)  # fails here instead of when the response is sent
+            payload = encode_payload(result.get('payload'))
+        except (TypeError, ValueError):
+            return PreparedResponse(self.uuid, StatusCodes.INTERNAL_SERVER_ERROR, _NULL)
+        return PreparedResponse(self.uuid, status, payload, headers)
+
+    def build_error(self, status: int, error: Error) -> PreparedResponse:
+        return PreparedResponse(self.uuid, status, encode_payload(error))
+
+
+class SlimHandlerArg:
+    """`HandlerArg` without pydantic, with the same attributes. the scope is the connection's own, not a copy"""
+    __slots__ = ('scope', 'headers', 'payload', 'store')
+
+    def __init__(self, scope: dict, headers: Header, payload: Any, store: AuxiliaryStore):
+        self.scope = scope
+        self.headers = headers
+        self.payload = payload
+        self.store = store
+
+    def __repr__(self):
+        return f'SlimHandlerArg(headers={self.headers!r}, payload={self.payload!r}, store={self.store!r})'
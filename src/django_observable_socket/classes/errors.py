@@ -11,6 +11,11 @@ class CallError(str, Enum):
     MethodNotImplemented = "Method Not Implemented"
     BadRequestFormat = "Request Format Error"
     InternalServerError = "Internal Server Error"
+    BatchTooLarge = "Batch Too Large"
+    TooManyRequests = "Too Many Requests"
+    FrameTooLarge = "Frame Too Large"
+    Timeout = "Timeout"
+    Overloaded = "Overloaded"
 
 
 def set_error(error: CallError) -> Error:
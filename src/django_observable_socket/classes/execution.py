@@ -0,0 +1,81 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Mapping, Tuple
+
+from django.db import close_old_connections
+
+
+class Execution(str, Enum):
+    """where the async consumer runs a sync hook"""
+    INLINE = 'inline'
+    """on the event loop, the default"""
+    THREAD = 'thread'
+    """in a bounded thread pool, for blocking calls like ORM queries"""
+    PROCESS = 'process'
+    """in a process pool, for CPU-heavy work like large dehydration. the function and its input must be picklable"""
+
+
+HOOKS = ('check_data', 'check_access', 'hydrate', 'handler', 'dehydrate')
+
+ExecutionPolicy = Mapping[str, Execution | str]
+"""
+    execution of every hook which shouldn't run inline, e.g. `{'hydrate': 'thread', 'dehydrate': 'process'}`
+"""
+
+
+def resolve_policy(owner_name: str, route: str, *policies: ExecutionPolicy | None) -> Dict[str, Execution]:
+    """merges policies, later ones win, and keeps only the hooks leaving the event loop"""
+    resolved = {}
+    for policy in policies:
+        for hook, execution in (policy or {}).items():
+            if hook not in HOOKS:
+                raise TypeError(f"{owner_name}: unknown hook `{hook}` in the execution policy of `{route}`")
+            resolved[hook] = Execution(execution)
+
+    if resolved.get('handler') is Execution.PROCESS:
+        raise TypeError(f"{owner_name}: the handler of `{route}` is a consumer method and can't run in a process pool")
+    return {hook: execution for hook, execution in resolved.items() if execution is not Execution.INLINE}
+
+
+_executors: Dict[Tuple[Execution, int], Executor] = {}
+
+
+def get_executor(execution: Execution, size: int) -> Executor:
+    """pools are shared by the whole worker, one per kind and size"""
+    executor = _executors.get((execution, size))
+    if executor is None:
+        if execution is Execution.PROCESS:
+            executor = ProcessPoolExecutor(max_workers=size)
+        else:
+            executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='observable-socket')
+        _executors[(execution, size)] = executor
+    return executor
+
+
+def _timed(method: Callable, args: Tuple) -> Tuple[float, float, Any]:
+    # time.monotonic is system-wide, so it's comparable between processes
+    started = time.monotonic()
+    result = method(*args)
+    return started, time.monotonic(), result
+
+
+def _timed_in_thread(method: Callable, args: Tuple) -> Tuple[float, float, Any]:
+    """
+        like Channels' `database_sync_to_async`, the thread's unusable or expired database connections are closed
+        before and after the call
+    """
+    close_old_connections()
+    try:
+        return _timed(method, args)
+    finally:
+        close_old_connections()
+
+
+async def run_in_executor(executor: Executor, method: Callable, args: Tuple) -> Tuple[Any, float, float]:
+    """runs `method(*args)` in the executor, returns its result, and the seconds it spent queued and running"""
+    timed = _timed_in_thread if isinstance(executor, ThreadPoolExecutor) else _timed
+    submitted = time.monotonic()
+    started, finished, result = await asyncio.get_running_loop().run_in_executor(executor, timed, method, args)
+    return result, started - submitted, finished - started
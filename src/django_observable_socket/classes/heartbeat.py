@@ -0,0 +1,52 @@
+import json
+from typing import Any
+
+PING = 'PING'
+PONG = 'PONG'
+CANCEL = 'CANCEL'
+"""
+    control route cancelling the in-flight request with the same uuid, answered before any message model is built
+"""
+
+HEARTBEAT_FRAME_LIMIT = 128
+"""
+    heartbeats are tiny, longer frames are never inspected for them before decoding
+"""
+
+_PING_BYTES = PING.encode()
+_CANCEL_BYTES = CANCEL.encode()
+_PONG_FRAME = '{"headers":null,"payload":null,"uuid":%s,"route":"' + PONG + '"}'
+
+
+def may_be_heartbeat(frame: str | bytes) -> bool:
+    """cheap check on the raw frame, a positive answer still needs `is_heartbeat` on the decoded content"""
+    if len(frame) > HEARTBEAT_FRAME_LIMIT:
+        return False
+    return PING in frame if isinstance(frame, str) else _PING_BYTES in frame
+
+
+def is_heartbeat(content: Any) -> bool:
+    return _is_control(content, PING)
+
+
+def may_be_cancel(frame: str | bytes) -> bool:
+    """cheap check on the raw frame, a positive answer still needs `is_cancel` on the decoded content"""
+    if len(frame) > HEARTBEAT_FRAME_LIMIT:
+        return False
+    return CANCEL in frame if isinstance(frame, str) else _CANCEL_BYTES in frame
+
+
+def is_cancel(content: Any) -> bool:
+    return _is_control(content, CANCEL)
+
+
+def _is_control(content: Any, route: str) -> bool:
+    if type(content) is not dict or content.get('route') != route:
+        return False
+    uuid = content.get('uuid')
+    return isinstance(uuid, (str, int)) and not isinstance(uuid, bool)
+
+
+def pong_frame(uuid: str | int) -> str:
+    """pre-encoded PONG, only the uuid is spliced in"""
+    return _PONG_FRAME % json.dumps(uuid)
@@ -0,0 +1,80 @@
+from typing import Any, Optional
+
+from .errors import CallError, set_error
+from .message import PreparedResponse, encode_payload
+from .status import StatusCodes
+
+_TOO_LARGE = encode_payload(set_error(CallError.FrameTooLarge))
+
+
+def too_large(uuid: str | int = '') -> PreparedResponse:
+    """response to a frame above the limits, made without building (or validating) any model"""
+    return PreparedResponse(uuid, StatusCodes.PAYLOAD_TOO_LARGE, _TOO_LARGE)
+
+
+def payload_exceeds(payload: Any, depth: Optional[int], items: Optional[int]) -> bool:
+    """
+        walks a decoded payload, stops as soon as it's nested deeper than `depth` levels
+        or holds more than `items` values in total
+    """
+    max_depth = depth if depth is not None else float('inf')
+    items_left = items if items is not None else float('inf')
+    stack = [(payload, 1)]
+    while stack:
+        value, level = stack.pop()
+        if isinstance(value, dict):
+            children = value.values()
+        elif isinstance(value, list):
+            children = value
+        else:
+            continue
+        if level > max_depth:
+            return True
+        items_left -= len(children)
+        if items_left < 0:
+            return True
+        stack.extend((child, level + 1) for child in children if isinstance(child, (dict, list)))
+    return False
+
+
+class FrameLimits:
+    """
+        Bounds of an incoming request, the ones above it are answered with `PAYLOAD_TOO_LARGE`.
+
+        - `frame_size`: length of the raw frame, characters of a text frame or bytes of a binary frame.
+          checked before the frame is decoded, per route once it's decoded (not for the requests of a batch)
+        - `payload_depth`: nesting levels of lists and objects in the payload, `{'a': [1]}` is 2 levels deep
+        - `payload_items`: values held by all the lists and objects of the payload
+        - `headers`: number of headers
+
+        the payload and headers are checked on the decoded frame, before the request is validated.
+    """
+    __slots__ = ('frame_size', 'payload_depth', 'payload_items', 'headers')
+
+    def __init__(self, frame_size: Optional[int] = None, payload_depth: Optional[int] = None,
+                 payload_items: Optional[int] = None, headers: Optional[int] = None):
+        self.frame_size = frame_size
+        self.payload_depth = payload_depth
+        self.payload_items = payload_items
+        self.headers = headers
+
+    @property
+    def inspects_content(self) -> bool:
+        return self.payload_depth is not None or self.payload_items is not None or self.headers is not None
+
+    def frame_exceeds(self, size: int) -> bool:
+        return self.frame_size is not None and size > self.frame_size
+
+    def content_exceeds(self, content: Any, size: int = 0) -> bool:
+        """checks a decoded request, `size` is the length of its frame, 0 if unknown"""
+        if self.frame_exceeds(size):
+            return True
+        if not isinstance(content, dict):
+            return False  # it won't pass validation anyway
+        if self.headers is not None:
+            headers = content.get('headers')
+            if isinstance(headers, dict) and len(headers) > self.headers:
+                return True
+        if self.payload_depth is not None or self.payload_items is not None:
+            return payload_exceeds(content.get('payload'), self.payload_depth, self.payload_items)
+        return False
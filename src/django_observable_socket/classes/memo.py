@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+from .conditional import content_version
+from .message import encode_payload
+from .types import AuxiliaryStore, HandlerArg
+
+FORGET_CHECKS = 'observable.forget_checks'
+"""
+    channel-layer event type making the consumers receiving it forget the remembered checks of their connection,
+    of every route or of the event's `route`, see `forget_checks`
+"""
+
+MemoKeyMethod = Callable[[HandlerArg], Optional[Hashable]]
+
+
+class CheckMemo:
+    """
+        Remembers the result of `check_access` of a route, and of `check_data` too with `data=True`, per connection,
+        for `ttl` seconds.
+
+        `key` maps a request to what the checks depend on besides the connection's user, e.g. `lambda arg: arg.payload['id']`,
+        returning None runs the checks for that request. without `key`, requests share a result only when their headers
+        and payload are the same (a hash of both is the key). checks depending on the user alone may use
+        `key=lambda arg: ()` to run once per connection.
+
+        what a check writes to `arg.store` is remembered with its result and written again when the result is reused,
+        the same objects, not copies.
+    """
+
+    def __init__(self, key: Optional[MemoKeyMethod] = None, ttl: float = 60, data: bool = False):
+        self.key = key
+        self.ttl = ttl
+        self.data = data
+        self.generation = 0
+
+    def make_key(self, arg: HandlerArg) -> Optional[Hashable]:
+        if self.key is not None:
+            return self.key(arg)
+        return content_version(encode_payload((arg.headers, arg.payload)))
+
+    def invalidate(self):
+        """forgets the results remembered by every connection of this worker, e.g. from a model signal receiver"""
+        self.generation += 1
+
+
+def store_writes(before: AuxiliaryStore, store: AuxiliaryStore) -> Optional[AuxiliaryStore]:
+    """entries of `store` a check added or replaced, `before` being a copy of it from before the check ran"""
+    written = {name: value for name, value in store.items() if name not in before or before[name] is not value}
+    return written or None
+
+
+class CheckResults:
+    """
+        Check results remembered by a connection, by (route, hook, key), with the entries the check wrote to
+        `arg.store`. the least recently used ones are dropped above `max_entries`.
+    """
+    __slots__ = ('max_entries', '_entries')
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Tuple[float, int, bool, Optional[AuxiliaryStore]]] = OrderedDict()
+
+    def get(self, key: Hashable, memo: CheckMemo) -> Optional[Tuple[bool, Optional[AuxiliaryStore]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, generation, result, written = entry
+        if generation != memo.generation or expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result, written
+
+    def put(self, key: Hashable, memo: CheckMemo, result: bool, written: Optional[AuxiliaryStore] = None):
+        self._entries[key] = (time.monotonic() + memo.ttl, memo.generation, result, written)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def forget(self, route: Optional[str] = None):
+        if route is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == route]:
+            del self._entries[key]
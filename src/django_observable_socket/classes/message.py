@@ -1,8 +1,12 @@
-from typing import Optional
+import json
+from typing import Any, Optional
 
 from pydantic import BaseModel, ValidationError, JsonValue, ConfigDict
+from pydantic_core import to_json
 
-from .errors import Error
+from .conditional import ETAG
+from .errors import Error, CallError, set_error
+from .rate_limit import RETRY_AFTER
 from .status import StatusCodes
 from .types import Header, SocketResult
 
@@ -37,6 +41,62 @@ class ResponseMessage(Envelope):
         Status Field is supposed to be set for sending responses, just like HTTP calls.
     """
 
+    @classmethod
+    def bad_format(cls, uuid: str | int = '') -> 'ResponseMessage':
+        """response to a frame which couldn't be validated as a `RequestMessage`"""
+        return cls(uuid=uuid, status=StatusCodes.BAD_REQUEST, payload=set_error(CallError.BadRequestFormat))
+
+    @classmethod
+    def not_modified(cls, uuid: str | int, etag: str) -> 'ResponseMessage':
+        return cls(uuid=uuid, status=StatusCodes.NOT_MODIFIED, headers={ETAG: etag})
+
+    @classmethod
+    def batch_too_large(cls, uuid: str | int = '') -> 'ResponseMessage':
+        """response to a batched request above the consumer's `max_batch_size`, which isn't run"""
+        return cls(uuid=uuid, status=StatusCodes.PAYLOAD_TOO_LARGE, payload=set_error(CallError.BatchTooLarge))
+
+    @classmethod
+    def too_many_requests(cls, uuid: str | int, retry_after: float) -> 'ResponseMessage':
+        """response to a request above a `RateLimit`, which isn't run"""
+        return cls(uuid=uuid, status=StatusCodes.TOO_MANY_REQUESTS, headers={RETRY_AFTER: round(retry_after, 3)},
+                   payload=set_error(CallError.TooManyRequests))
+
+    @classmethod
+    def service_unavailable(cls, uuid: str | int, retry_after: float) -> 'ResponseMessage':
+        """response to a request shed by an overloaded `Scheduler`, which isn't run"""
+        return cls(uuid=uuid, status=StatusCodes.SERVICE_UNAVAILABLE, headers={RETRY_AFTER: round(retry_after, 3)},
+                   payload=set_error(CallError.Overloaded))
+
+
+def encode_payload(payload: Any) -> str:
+    """
+        JSON text of an (already dehydrated) payload which is encoded once and sent many times,
+        like a published update or a cached response.
+    """
+    return to_json(payload).decode()
+
+
+class PreparedResponse:
+    """
+        A response around a payload already encoded by `encode_payload`.
+        it dumps like a `ResponseMessage`, but JSON codecs only write the envelope and splice the payload in.
+    """
+    __slots__ = ('uuid', 'status', 'payload', 'headers')
+
+    def __init__(self, uuid: str | int, status: int, payload: str, headers: Header = None):
+        self.uuid = uuid
+        self.status = status
+        self.payload = payload
+        self.headers = headers
+
+    def model_dump(self) -> dict:
+        return {'headers': self.headers, 'payload': json.loads(self.payload), 'uuid': self.uuid, 'status': self.status}
+
+    def model_dump_json(self) -> str:
+        return '{"headers":%s,"payload":%s,"uuid":%s,"status":%d}' % (
+            'null' if self.headers is None else json.dumps(self.headers), self.payload, json.dumps(self.uuid), self.status
+        )
+
 
 class RequestMessage(Envelope):
     model_config = ConfigDict(frozen=True)
@@ -48,28 +108,36 @@ class RequestMessage(Envelope):
         method names will follow this: f"on_{snakecase(route)}"
     """
 
-    def respond(self, result: SocketResult):
+    def build_response(self, result: SocketResult) -> ResponseMessage | None:
         response = {
             'uuid': self.uuid, **result
         }
         try:
-            return ResponseMessage(**response).model_dump()
+            return ResponseMessage(**response)
         except ValidationError:
             try:
-                return ResponseMessage(uuid=self.uuid, status=StatusCodes.INTERNAL_SERVER_ERROR).model_dump()
+                return ResponseMessage(uuid=self.uuid, status=StatusCodes.INTERNAL_SERVER_ERROR)
             except ValidationError:
                 return None
 
-    def error(self, status: int, error: Error):
+    def build_error(self, status: int, error: Error) -> ResponseMessage | None:
         error = {
             'uuid': self.uuid,
             'status': status,
             'payload': error
         }
         try:
-            return ResponseMessage(**error).model_dump()
+            return ResponseMessage(**error)
         except ValidationError:
             try:
-                return ResponseMessage(uuid=self.uuid, status=StatusCodes.INTERNAL_SERVER_ERROR).model_dump()
+                return ResponseMessage(uuid=self.uuid, status=StatusCodes.INTERNAL_SERVER_ERROR)
             except ValidationError:
                 return None
+
+    def respond(self, result: SocketResult):
+        response = self.build_response(result)
+        return response.model_dump() if response else None
+
+    def error(self, status: int, error: Error):
+        response = self.build_error(status, error)
+        return response.model_dump() if response else None
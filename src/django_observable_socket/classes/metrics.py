@@ -0,0 +1,134 @@
+from typing import Callable, Dict, Optional, Sequence
+
+UNKNOWN_ROUTE = '<unknown>'
+"""
+    route label of requests to routes the consumer doesn't have, so clients can't grow the number of label values
+"""
+
+BATCH = '<batch>'
+"""
+    route label of the encoding of a whole batch frame
+"""
+
+PHASES = ('check_data', 'check_access', 'hydrate', 'handler', 'dehydrate', 'encode')
+
+
+class MetricsSink:
+    """
+        Receives the measurements of a consumer, set it as the consumer's `metrics`. every method is a no-op here,
+        override the ones you need. durations are in seconds, sizes are lengths of frames.
+        methods are called on the event loop (or the consumer's thread), they must not block.
+    """
+
+    def request_started(self, route: str):
+        """a request starts running, with `request_finished` it makes an in-flight gauge"""
+
+    def request_finished(self, route: str, status: Optional[int], duration: float):
+        """a request is answered, from validation until its response is sent. `status` is None if it was cancelled"""
+
+    def phase(self, route: str, phase: str, duration: float):
+        """a step of the pipeline of a request ran, see `PHASES`"""
+
+    def execution(self, route: str, hook: str, queued: float, running: float):
+        """a hook ran in a pool (see `execution`), after waiting `queued` seconds for a worker"""
+
+    def frame_received(self, size: int):
+        pass
+
+    def frame_sent(self, size: int):
+        pass
+
+
+class CallbackMetrics(MetricsSink):
+    """
+        Passes every measurement to `callback(name, value, labels)`, e.g. to forward them to statsd:
+        `('requests', 1, {'route': 'getArticle', 'status': 200})`, `('request_seconds', 0.004, {'route': 'getArticle'})`,
+        `('phase_seconds', 0.001, {'route': 'getArticle', 'phase': 'hydrate'})`, `('in_flight', 3, {})`,
+        `('frame_bytes', 512, {'direction': 'in'})`, `('queued_seconds', ...)` and `('running_seconds', ...)`.
+    """
+
+    def __init__(self, callback: Callable[[str, float, Dict[str, str | int | None]], None]):
+        self.callback = callback
+        self.in_flight = 0
+
+    def request_started(self, route: str):
+        self.in_flight += 1
+        self.callback('in_flight', self.in_flight, {})
+
+    def request_finished(self, route: str, status: Optional[int], duration: float):
+        self.in_flight -= 1
+        self.callback('in_flight', self.in_flight, {})
+        self.callback('requests', 1, {'route': route, 'status': status})
+        self.callback('request_seconds', duration, {'route': route})
+
+    def phase(self, route: str, phase: str, duration: float):
+        self.callback('phase_seconds', duration, {'route': route, 'phase': phase})
+
+    def execution(self, route: str, hook: str, queued: float, running: float):
+        self.callback('queued_seconds', queued, {'route': route, 'hook': hook})
+        self.callback('running_seconds', running, {'route': route, 'hook': hook})
+
+    def frame_received(self, size: int):
+        self.callback('frame_bytes', size, {'direction': 'in'})
+
+    def frame_sent(self, size: int):
+        self.callback('frame_bytes', size, {'direction': 'out'})
+
+
+_SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class PrometheusMetrics(MetricsSink):
+    """
+        Exports the measurements with prometheus_client (`pip install prometheus-client`), create it once per process
+        and share it between consumers: `<namespace>_requests_total{route,status}`, `<namespace>_request_seconds{route}`,
+        `<namespace>_phase_seconds{route,phase}`, `<namespace>_in_flight`, `<namespace>_frame_bytes{direction}`,
+        `<namespace>_queued_seconds{route,hook}` and `<namespace>_running_seconds{route,hook}`.
+    """
+
+    def __init__(self, namespace: str = 'observable_socket', registry=None,
+                 buckets: Optional[Sequence[float]] = None):
+        try:
+            import prometheus_client
+        except ImportError as e:
+            raise ImportError("PrometheusMetrics requires prometheus-client, "
+                              "install it with `pip install prometheus-client`") from e
+        options = {'namespace': namespace}
+        if registry is not None:
+            options['registry'] = registry
+        time_options = dict(options, buckets=buckets) if buckets is not None else options
+        self._requests = prometheus_client.Counter('requests', 'Answered requests', ['route', 'status'], **options)
+        self._latency = prometheus_client.Histogram('request_seconds', 'Time to answer a request', ['route'],
+                                                    **time_options)
+        self._phases = prometheus_client.Histogram('phase_seconds', 'Time spent per step of the pipeline',
+                                                   ['route', 'phase'], **time_options)
+        self._in_flight = prometheus_client.Gauge('in_flight', 'Requests running', **options)
+        self._sizes = prometheus_client.Histogram('frame_bytes', 'Size of frames', ['direction'],
+                                                  buckets=_SIZE_BUCKETS, **options)
+        self._queued = prometheus_client.Histogram('queued_seconds', 'Time offloaded hooks waited for a pool worker',
+                                                   ['route', 'hook'], **time_options)
+        self._running = prometheus_client.Histogram('running_seconds', 'Time offloaded hooks ran on a pool worker',
+                                                    ['route', 'hook'], **time_options)
+        self._frames_in = self._sizes.labels('in')
+        self._frames_out = self._sizes.labels('out')
+
+    def request_started(self, route: str):
+        self._in_flight.inc()
+
+    def request_finished(self, route: str, status: Optional[int], duration: float):
+        self._in_flight.dec()
+        self._requests.labels(route, 'cancelled' if status is None else str(status)).inc()
+        self._latency.labels(route).observe(duration)
+
+    def phase(self, route: str, phase: str, duration: float):
+        self._phases.labels(route, phase).observe(duration)
+
+    def execution(self, route: str, hook: str, queued: float, running: float):
+        self._queued.labels(route, hook).observe(queued)
+        self._running.labels(route, hook).observe(running)
+
+    def frame_received(self, size: int):
+        self._frames_in.observe(size)
+
+    def frame_sent(self, size: int):
+        self._frames_out.observe(size)
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Literal, Optional
+
+RETRY_AFTER = 'Retry-After'
+"""
+    response header carrying the seconds to wait before the client may send the rejected request again
+"""
+
+RateLimitKey = Literal['connection', 'user', 'ip'] | Callable[[dict], Optional[Hashable]]
+
+
+class TokenBucket:
+    """
+        `capacity` tokens, refilled at `rate` tokens per second, every request takes one.
+        the bucket is refilled lazily when a token is taken, so an idle bucket costs nothing.
+    """
+    __slots__ = ('tokens', 'stamp')
+
+    def __init__(self, tokens: float, stamp: float):
+        self.tokens = tokens
+        self.stamp = stamp
+
+    def take(self, rate: float, capacity: float, now: float) -> float:
+        """takes a token, returns 0 if there was one, otherwise the seconds until there's one"""
+        tokens = self.tokens + (now - self.stamp) * rate
+        if tokens > capacity:
+            tokens = capacity
+        self.stamp = now
+        if tokens >= 1:
+            self.tokens = tokens - 1
+            return 0
+        self.tokens = tokens
+        return (1 - tokens) / rate
+
+
+class RateLimitBackend:
+    """stores the buckets of a `RateLimit` keyed by user or ip"""
+
+    def take(self, key: Hashable, rate: float, capacity: float) -> float:
+        raise NotImplementedError
+
+    async def atake(self, key: Hashable, rate: float, capacity: float) -> float:
+        return self.take(key, rate, capacity)
+
+    def reset(self, key: Hashable):
+        raise NotImplementedError
+
+
+class LocMemRateLimitBackend(RateLimitBackend):
+    """in-process buckets, the least recently used ones are dropped once `max_entries` are stored"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: Hashable, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(capacity, now)
+                if len(self._buckets) > self.max_entries:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(rate, capacity, now)
+
+    def reset(self, key: Hashable):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class DjangoRateLimitBackend(RateLimitBackend):
+    """
+        buckets stored in one of the project's `CACHES`, so the limit holds across all workers.
+        `key_prefix` has to be unique per `RateLimit`. a bucket is read and written back without a lock,
+        so concurrent requests of the same key may slip a few requests through, use a fast cache like redis.
+    """
+
+    def __init__(self, key_prefix: str, alias: str = 'default'):
+        self.key_prefix = key_prefix
+        self.alias = alias
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def _cache_key(self, key: Hashable) -> str:
+        return f'{self.key_prefix}:{key}'
+
+    @staticmethod
+    def _take(state: Any, rate: float, capacity: float, now: float):
+        bucket = TokenBucket(capacity, now) if state is None else TokenBucket(*state)
+        retry_after = bucket.take(rate, capacity, now)
+        # a bucket left alone until it's full again is the same as no bucket
+        return retry_after, (bucket.tokens, bucket.stamp), (capacity - bucket.tokens) / rate + 1
+
+    def take(self, key: Hashable, rate: float, capacity: float) -> float:
+        cache_key = self._cache_key(key)
+        cache = self.cache
+        retry_after, state, timeout = self._take(cache.get(cache_key), rate, capacity, time.time())
+        cache.set(cache_key, state, timeout=timeout)
+        return retry_after
+
+    async def atake(self, key: Hashable, rate: float, capacity: float) -> float:
+        cache_key = self._cache_key(key)
+        cache = self.cache
+        retry_after, state, timeout = self._take(await cache.aget(cache_key), rate, capacity, time.time())
+        await cache.aset(cache_key, state, timeout=timeout)
+        return retry_after
+
+    def reset(self, key: Hashable):
+        self.cache.delete(self._cache_key(key))
+
+
+class RateLimit:
+    """
+        Allows `rate` requests per `per` seconds, with bursts of up to `burst` requests (`rate` by default).
+        use one instance per route (and one for the consumer's own `rate_limit`).
+
+        `key` decides who shares a bucket:
+        - `'connection'`: every socket has its own buckets, kept on the consumer and dropped on disconnect
+        - `'user'`: every authenticated user, anonymous users are limited by ip
+        - `'ip'`: every client address
+        - a function taking the connection's `scope` and returning the key, None skips the limit
+
+        buckets of users and ips are stored in `backend`, `LocMemRateLimitBackend` by default,
+        `DjangoRateLimitBackend` makes the limit hold across workers.
+    """
+
+    def __init__(self, rate: float, per: float = 1, burst: Optional[float] = None, key: RateLimitKey = 'connection',
+                 backend: Optional[RateLimitBackend] = None):
+        if rate <= 0 or per <= 0:
+            raise ValueError('rate and per of a RateLimit must be positive')
+        if not callable(key) and key not in ('connection', 'user', 'ip'):
+            raise ValueError(f"unknown RateLimit key '{key}', use 'connection', 'user', 'ip' or a function")
+        self.rate = rate / per  # tokens per second
+        self.capacity = max(burst if burst is not None else rate, 1)
+        self.key = key
+        self.per_connection = key == 'connection'
+        self.backend = backend if backend is not None or self.per_connection else LocMemRateLimitBackend()
+
+    def identify(self, scope: dict) -> Optional[Hashable]:
+        """key of the bucket the connection takes tokens from, for limits not kept per connection"""
+        key = self.key
+        if callable(key):
+            return key(scope)
+        if key == 'user':
+            user = scope.get('user')
+            if user is not None and user.is_authenticated:
+                return user.pk
+        client = scope.get('client')
+        return client[0] if client else None
+
+    def bucket(self) -> TokenBucket:
+        """a new, full, bucket of a connection"""
+        return TokenBucket(self.capacity, time.monotonic())
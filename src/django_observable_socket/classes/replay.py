@@ -0,0 +1,57 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .cache import CachedResponse, DjangoResponseCache, LocMemResponseCache, ResponseCache
+from .message import PreparedResponse, ResponseMessage, encode_payload
+from .status import StatusCodes
+
+ReplayKeyMethod = Callable[[dict], Optional[Hashable]]
+
+_NOT_REPLAYED = (StatusCodes.TOO_MANY_REQUESTS,)
+
+
+def replayable(response: Any) -> Optional[CachedResponse]:
+    """
+        status, encoded payload and headers of a response worth answering a retry with, None for streams, server errors
+        and `TOO_MANY_REQUESTS`, which a retry may get past
+    """
+    if not isinstance(response, (ResponseMessage, PreparedResponse)):
+        return None
+    status = response.status
+    if status >= StatusCodes.INTERNAL_SERVER_ERROR or status in _NOT_REPLAYED:
+        return None
+    if isinstance(response, PreparedResponse):
+        return status, response.payload, response.headers
+    return status, encode_payload(response.payload), response.headers
+
+
+class Idempotency:
+    """
+        Keeps the responses of a route by client and request uuid for `ttl` seconds, so a request the client retries
+        (e.g. after a reconnect) is answered with the response of the first one instead of running again.
+
+        `key` identifies the client from the connection's `scope`: by default the authenticated user's pk,
+        requests of anonymous users are never replayed. responses are kept in memory, up to `max_entries` of them,
+        or in the `alias` cache of the project's `CACHES` to be shared by all workers.
+
+        in the async consumer, a duplicate arriving while the first request still runs waits for its response.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 10000, key: Optional[ReplayKeyMethod] = None,
+                 alias: Optional[str] = None, key_prefix: str = 'replay'):
+        self.key = key
+        # the router makes the keys, `ResponseCache.key` is never called
+        self.store: ResponseCache = LocMemResponseCache(None, ttl, max_entries) if alias is None \
+            else DjangoResponseCache(None, key_prefix, ttl, alias)
+        self.pending: Dict[Hashable, Any] = {}
+        """futures of the requests running in this worker, by key"""
+
+    def identify(self, scope: dict, route: str, uuid: str | int) -> Optional[str]:
+        """key of a request, None if it can't be replayed"""
+        if self.key is not None:
+            client = self.key(scope)
+        else:
+            user = scope.get('user')
+            client = user.pk if user is not None and user.is_authenticated else None
+        if client is None or uuid == '':
+            return None
+        return f'{client}:{route}:{uuid}'
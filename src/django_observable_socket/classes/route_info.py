@@ -1,10 +1,21 @@
-from pydantic import BaseModel, TypeAdapter
+from pydantic import BaseModel, TypeAdapter, ConfigDict
 from typing_extensions import Generic, Any, TypedDict, Optional
 
-from .types import CheckMethod, HydrateMethod, DeHydrateMethod, HydratedPayload, HandlerPayload
+from .cache import ResponseCache
+from .delta import Delta
+from .execution import ExecutionPolicy
+from .limits import FrameLimits
+from .memo import CheckMemo
+from .replay import Idempotency
+from .scheduler import Lane
+from .rate_limit import RateLimit
+from .types import CheckMethod, HydrateMethod, DeHydrateMethod, HydratedPayload, HandlerPayload, GroupMethod, \
+    BatchHydrateMethod, VersionMethod
 
 
 class RouteInfoDict(TypedDict, total=False):
+    __pydantic_config__ = ConfigDict(arbitrary_types_allowed=True)
+
     route: str
     """
         if the incoming message has route attribute equal to `loadNode` then the on_load_node method will be called automatically.
@@ -38,8 +49,108 @@ class RouteInfoDict(TypedDict, total=False):
         PS. the dehydrate function runs only if status code is successful (200 series)
     """
 
+    batch_hydrate: Optional[BatchHydrateMethod]
+    """
+        alternative to `hydrate` which loads many requests at once: takes a list of `HandlerArg`s and returns their
+        hydrated payloads in the same order, e.g. a single `id__in` query instead of one query per request.
+        requests of the same route arriving within `batch_window` are collected, up to `batch_max_size` of them.
+    """
+
+    batch_window: float
+    """
+        seconds to wait for more requests before running `batch_hydrate`, 5ms by default. 0 only collects the requests
+        of the same event-loop tick, which in practice means the same frame
+    """
+
+    batch_max_size: int
+    """
+        `batch_hydrate` runs right away once this many requests are waiting
+    """
+
+    batch_per_worker: bool
+    """
+        collect requests of all connections served by the worker instead of a single connection
+    """
+
+    execution: Optional[ExecutionPolicy]
+    """
+        where the async consumer runs the sync hooks of this route, overriding the consumer's `execution` per hook.
+        e.g. `{'hydrate': 'thread', 'dehydrate': 'process'}`, see `Execution`
+    """
+
+    version: Optional[VersionMethod]
+    """
+        a cheap function returning the current version of the response (like `updated_at` of the requested entity).
+        it runs after `check_data` and `check_access`, when it matches the client's `If-None-Match` header
+        the request is answered with `NOT_MODIFIED` before hydrate runs, otherwise the version is sent in the `ETag` header.
+    """
+
+    etag: bool
+    """
+        for routes without `version`: send a hash of the dehydrated payload in the `ETag` header,
+        and answer with `NOT_MODIFIED` instead of the payload when it matches the client's `If-None-Match` header
+    """
+
+    cache: Optional[ResponseCache]
+    """
+        caches successful responses, already dehydrated and encoded, see `LocMemResponseCache` and `DjangoResponseCache`.
+        the cache is looked up after `check_data` and `check_access`, a hit skips hydrate, handler and dehydrate altogether.
+    """
+
+    memoize: Optional[CheckMemo]
+    """
+        remembers the results of `check_access` (and optionally `check_data`) per connection, see `CheckMemo`
+    """
+
+    idempotency: Optional[Idempotency]
+    """
+        answers retried requests (same client, same uuid) with the response of the first one, see `Idempotency`
+    """
+
+    lane: Lane
+    """
+        priority of the route's requests when the async consumer has a `scheduler`, see `Lane`
+    """
+
+    rate_limit: Optional[RateLimit]
+    """
+        limit of requests to this route, checked before `check_data`. requests above it are answered with
+        `TOO_MANY_REQUESTS` and a `Retry-After` header, see `RateLimit`
+    """
+
+    delta: Optional[Delta]
+    """
+        answer with JSON patches of the payload the client already has, see `Delta` and `DELTA_BASE`
+    """
+
+    timeout: Optional[float]
+    """
+        seconds the async consumer gives the request, from `check_data` to `dehydrate`, before cancelling it and
+        answering with `GATEWAY_TIMEOUT`. sync hooks running inline on the event loop can't be interrupted
+    """
+
+    limits: Optional[FrameLimits]
+    """
+        bounds of requests to this route, on top of the consumer's `limits`, see `FrameLimits`
+    """
+
+    stream_chunk_size: int
+    """
+        when the handler (or dehydrate) returns an iterator or a generator as payload, the response is streamed
+        in frames of this many items, see `StreamedResponse`
+    """
+
+    subscribe: Optional[GroupMethod]
+    """
+        makes the route observable: takes the hydrated input and returns the channel-layer group to join.
+        after a successful response, every update published to that group is pushed to the client tagged with the request uuid,
+        until the client sends an `UNSUBSCRIBE` message with the same uuid or disconnects.
+    """
+
 
 class GenericRouteInfo(BaseModel, Generic[HydratedPayload, HandlerPayload]):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     route: str
     """
         if the incoming message has route attribute equal to `loadNode` then the on_load_node method will be called automatically.
@@ -73,6 +184,104 @@ class GenericRouteInfo(BaseModel, Generic[HydratedPayload, HandlerPayload]):
       PS. the dehydrate function runs only if status code is successful (200 series)
     """
 
+    batch_hydrate: Optional[BatchHydrateMethod] = None
+    """
+        alternative to `hydrate` which loads many requests at once: takes a list of `HandlerArg`s and returns their
+        hydrated payloads in the same order, e.g. a single `id__in` query instead of one query per request.
+        requests of the same route arriving within `batch_window` are collected, up to `batch_max_size` of them.
+    """
+
+    batch_window: float = 0.005
+    """
+        seconds to wait for more requests before running `batch_hydrate`, 5ms by default. 0 only collects the requests
+        of the same event-loop tick, which in practice means the same frame
+    """
+
+    batch_max_size: int = 100
+    """
+        `batch_hydrate` runs right away once this many requests are waiting
+    """
+
+    batch_per_worker: bool = False
+    """
+        collect requests of all connections served by the worker instead of a single connection
+    """
+
+    execution: Optional[ExecutionPolicy] = None
+    """
+        where the async consumer runs the sync hooks of this route, overriding the consumer's `execution` per hook.
+        e.g. `{'hydrate': 'thread', 'dehydrate': 'process'}`, see `Execution`
+    """
+
+    version: Optional[VersionMethod] = None
+    """
+        a cheap function returning the current version of the response (like `updated_at` of the requested entity).
+        it runs after `check_data` and `check_access`, when it matches the client's `If-None-Match` header
+        the request is answered with `NOT_MODIFIED` before hydrate runs, otherwise the version is sent in the `ETag` header.
+    """
+
+    etag: bool = False
+    """
+        for routes without `version`: send a hash of the dehydrated payload in the `ETag` header,
+        and answer with `NOT_MODIFIED` instead of the payload when it matches the client's `If-None-Match` header
+    """
+
+    cache: Optional[ResponseCache] = None
+    """
+        caches successful responses, already dehydrated and encoded, see `LocMemResponseCache` and `DjangoResponseCache`.
+        the cache is looked up after `check_data` and `check_access`, a hit skips hydrate, handler and dehydrate altogether.
+    """
+
+    memoize: Optional[CheckMemo] = None
+    """
+        remembers the results of `check_access` (and optionally `check_data`) per connection, see `CheckMemo`
+    """
+
+    idempotency: Optional[Idempotency] = None
+    """
+        answers retried requests (same client, same uuid) with the response of the first one, see `Idempotency`
+    """
+
+    lane: Lane = Lane.NORMAL
+    """
+        priority of the route's requests when the async consumer has a `scheduler`, see `Lane`
+    """
+
+    rate_limit: Optional[RateLimit] = None
+    """
+        limit of requests to this route, checked before `check_data`. requests above it are answered with
+        `TOO_MANY_REQUESTS` and a `Retry-After` header, see `RateLimit`
+    """
+
+    delta: Optional[Delta] = None
+    """
+        answer with JSON patches of the payload the client already has, see `Delta` and `DELTA_BASE`
+    """
+
+    timeout: Optional[float] = None
+    """
+        seconds the async consumer gives the request, from `check_data` to `dehydrate`, before cancelling it and
+        answering with `GATEWAY_TIMEOUT`. sync hooks running inline on the event loop can't be interrupted
+    """
+
+    limits: Optional[FrameLimits] = None
+    """
+        bounds of requests to this route, on top of the consumer's `limits`, see `FrameLimits`
+    """
+
+    stream_chunk_size: int = 100
+    """
+        when the handler (or dehydrate) returns an iterator or a generator as payload, the response is streamed
+        in frames of this many items, see `StreamedResponse`
+    """
+
+    subscribe: Optional[GroupMethod] = None
+    """
+        makes the route observable: takes the hydrated input and returns the channel-layer group to join.
+        after a successful response, every update published to that group is pushed to the client tagged with the request uuid,
+        until the client sends an `UNSUBSCRIBE` message with the same uuid or disconnects.
+    """
+
 
 RouteInfoDictValidator = TypeAdapter(RouteInfoDict)
 
@@ -0,0 +1,106 @@
+import asyncio
+from collections import deque
+from enum import Enum
+from typing import Deque, Dict, Optional
+
+
+class Lane(str, Enum):
+    """priority of a route's requests in the async consumer's `scheduler`"""
+    HIGH = 'high'
+    """served first, never shed"""
+    NORMAL = 'normal'
+    """the default, shed once `max_queued` requests are waiting"""
+    LOW = 'low'
+    """served last, shed as soon as the worker is saturated or its event loop lags, e.g. bulk exports"""
+
+
+LANES = (Lane.HIGH, Lane.NORMAL, Lane.LOW)
+
+
+class Scheduler:
+    """
+        Admits the requests of every connection of a worker (share one instance between the consumers of the process).
+
+        at most `capacity` requests run at once, the others wait in their route's `Lane` and are started by priority,
+        then in order of arrival. a request of the low lane is shed when it would have to wait or when the event loop
+        lags more than `max_lag` seconds, one of the normal lane when `max_queued` requests are waiting already.
+        shed requests are answered with `SERVICE_UNAVAILABLE` and a `Retry-After` header of `retry_after` seconds.
+    """
+
+    def __init__(self, capacity: int = 64, max_queued: int = 1024, max_lag: float = 0.1, retry_after: float = 1,
+                 lag_interval: float = 0.05):
+        self.capacity = capacity
+        self.max_queued = max_queued
+        self.max_lag = max_lag
+        self.retry_after = retry_after
+        self.lag_interval = lag_interval
+        self.running = 0
+        self.lag = 0.0
+        """how late the event loop woke up the last time it was probed, in seconds"""
+        self._waiting: Dict[Lane, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self._monitor: Optional[asyncio.Task] = None
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiting) for waiting in self._waiting.values())
+
+    def shed(self, lane: Lane) -> float:
+        """0 if a request of `lane` is admitted, otherwise the seconds the client should wait before retrying"""
+        self._watch_lag()
+        if lane is Lane.HIGH:
+            return 0
+        if lane is Lane.LOW:
+            overloaded = self.running >= self.capacity or self.lag > self.max_lag
+        else:
+            overloaded = self.queued >= self.max_queued
+        return self.retry_after if overloaded else 0
+
+    async def acquire(self, lane: Lane):
+        """waits for a slot to run a request of `lane`, `release` it when the request is done"""
+        if self.running < self.capacity and not self._ahead_of(lane):
+            self.running += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting[lane].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot was handed over already
+            elif waiter in self._waiting[lane]:
+                self._waiting[lane].remove(waiter)
+            raise
+
+    def release(self):
+        # the slot goes straight to the next waiting request, if any
+        for lane in LANES:
+            waiting = self._waiting[lane]
+            while waiting:
+                waiter = waiting.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self.running -= 1
+
+    def _ahead_of(self, lane: Lane) -> bool:
+        """whether requests of `lane` or of a higher one are waiting"""
+        for waiting_lane in LANES:
+            if self._waiting[waiting_lane]:
+                return True
+            if waiting_lane is lane:
+                return False
+        return False
+
+    def _watch_lag(self):
+        """probes the event loop's lag in the background, from the first request on"""
+        monitor = self._monitor
+        if monitor is None or monitor.done() or monitor.get_loop() is not asyncio.get_running_loop():
+            self._monitor = asyncio.get_running_loop().create_task(self._probe())
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        interval = self.lag_interval
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.lag = max(0.0, loop.time() - start - interval)
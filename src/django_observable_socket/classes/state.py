@@ -0,0 +1,29 @@
+class ConnectionState:
+    """
+        What a connection keeps besides its scope, created the first time the connection needs any of it (an idle
+        connection has none) and dropped at once on disconnect. every part is itself created when first used.
+    """
+    __slots__ = ('subscriptions', 'buckets', 'deltas', 'checks', 'compression', 'compress', 'compress_lock',
+                 'batchers', 'in_flight', 'in_flight_slots')
+
+    def __init__(self):
+        self.subscriptions = None
+        """`Subscriptions` of the connection"""
+        self.buckets = None
+        """`TokenBucket`s of the per-connection `RateLimit`s, by limit"""
+        self.deltas = None
+        """`DeltaStore` of the routes with `delta`"""
+        self.checks = None
+        """`CheckResults` of the routes with `memoize`"""
+        self.compression = None
+        """the negotiated `Compression`"""
+        self.compress = None
+        """its `CompressionContext`"""
+        self.compress_lock = None
+        """async consumer: keeps compressed frames in order"""
+        self.batchers = None
+        """async consumer: `HydrateBatcher`s of the connection, by route"""
+        self.in_flight = None
+        """async consumer: running requests by uuid (a batch by its own task), so a `CANCEL` message can find them"""
+        self.in_flight_slots = None
+        """async consumer: semaphore bounding the running requests to `max_in_flight`"""
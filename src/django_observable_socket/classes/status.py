@@ -4,6 +4,14 @@ class StatusCodes:
     CREATED = 201
     ACCEPTED = 202
     NO_CONTENT = 204
+    PARTIAL_CONTENT = 206
+
+    # Redirection messages
+    NOT_MODIFIED = 304
+    """
+        the client's `If-None-Match` header matches the current version (`ETag`) of the route's response,
+        sent without payload, the client keeps using the payload it already has
+    """
 
     # Client error responses
     BAD_REQUEST = 400
@@ -0,0 +1,96 @@
+from collections.abc import AsyncIterator, Iterator
+from functools import partial
+from typing import Any, AsyncIterator as AsyncIteratorType, Iterator as IteratorType, List
+
+from asgiref.sync import sync_to_async
+
+from .errors import CallError, set_error
+from .message import ResponseMessage
+from .status import StatusCodes
+from .types import Header
+
+CHUNK = 'Chunk'
+"""
+    header of every partial (`PARTIAL_CONTENT`) frame of a streamed response: the index of the chunk
+"""
+
+CHUNKS = 'Chunks'
+"""
+    header of the frame ending a streamed response: the number of chunks sent before it
+"""
+
+
+def is_stream(payload: Any) -> bool:
+    """sync or async iterators (e.g. generators) are streamed, other payloads, lists included, are sent whole"""
+    return isinstance(payload, (Iterator, AsyncIterator))
+
+
+class StreamedResponse:
+    """
+        A response whose payload is an iterator. it's sent as a series of `PARTIAL_CONTENT` frames holding
+        up to `chunk_size` items each, followed by a payload-less frame with the final status,
+        all of them tagged with the request uuid.
+    """
+    __slots__ = ('uuid', 'status', 'items', 'headers', 'chunk_size')
+
+    def __init__(self, uuid: str | int, status: int, items: Iterator | AsyncIterator, headers: Header = None,
+                 chunk_size: int = 100):
+        self.uuid = uuid
+        self.status = status
+        self.items = items
+        self.headers = headers
+        self.chunk_size = chunk_size
+
+    def chunks(self) -> IteratorType[List[Any]]:
+        if isinstance(self.items, AsyncIterator):
+            raise TypeError("async iterators can only be streamed by AsyncSocketRouterConsumer")
+        chunk = []
+        for item in self.items:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    async def achunks(self) -> AsyncIteratorType[List[Any]]:
+        if not isinstance(self.items, AsyncIterator):
+            # a sync iterator may run queries (e.g. `queryset.iterator()`), every chunk is pulled off the event loop,
+            # always in the same thread, the one holding the iterator's database cursor
+            next_chunk = sync_to_async(partial(next, self.chunks(), None), thread_sensitive=True)
+            while True:
+                chunk = await next_chunk()
+                if chunk is None:
+                    return
+                yield chunk
+
+        chunk = []
+        async for item in self.items:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def chunk(self, index: int, items: List[Any]) -> ResponseMessage:
+        return ResponseMessage(uuid=self.uuid, status=StatusCodes.PARTIAL_CONTENT, headers={CHUNK: index}, payload=items)
+
+    def end(self, count: int) -> ResponseMessage:
+        headers = {**self.headers, CHUNKS: count} if self.headers else {CHUNKS: count}
+        return ResponseMessage(uuid=self.uuid, status=self.status, headers=headers)
+
+    def failed(self, count: int) -> ResponseMessage:
+        """ends a stream whose iterator raised an exception"""
+        return ResponseMessage(uuid=self.uuid, status=StatusCodes.INTERNAL_SERVER_ERROR, headers={CHUNKS: count},
+                               payload=set_error(CallError.InternalServerError))
+
+    def collect(self) -> ResponseMessage:
+        """the whole payload in a single response, e.g. for a request of a batch"""
+        return ResponseMessage(uuid=self.uuid, status=self.status, headers=self.headers, payload=list(self.items))
+
+    async def acollect(self) -> ResponseMessage:
+        if not isinstance(self.items, AsyncIterator):
+            return await sync_to_async(self.collect, thread_sensitive=True)()
+        payload = [item async for item in self.items]
+        return ResponseMessage(uuid=self.uuid, status=self.status, headers=self.headers, payload=payload)
@@ -0,0 +1,57 @@
+from typing import Dict, List, Tuple
+
+UNSUBSCRIBE = 'UNSUBSCRIBE'
+PUSH_EVENT = 'observable.push'
+"""
+    channel-layer event type carrying a published update, handled by the consumers' `observable_push` method
+"""
+
+
+class Subscriptions:
+    """
+        Subscriptions of a single connection, by the uuid of the subscribing request and by channel-layer group.
+        a connection joins a group once, no matter how many of its requests subscribed to it.
+    """
+    __slots__ = ('_groups', '_uuids')
+
+    def __init__(self):
+        self._groups: Dict[str | int, str] = {}
+        self._uuids: Dict[str, List[str | int]] = {}
+
+    def add(self, uuid: str | int, group: str) -> Tuple[bool, str | None]:
+        """
+            returns whether the connection has to join the group, and the group it has to leave, if `uuid` was
+            the last subscription to another one
+        """
+        left = self.remove(uuid)
+        if left == group:  # subscribed to the same group again, the connection stays in it
+            left = None
+            self._uuids[group] = []
+        self._groups[uuid] = group
+        uuids = self._uuids.get(group)
+        if uuids is None:
+            self._uuids[group] = [uuid]
+            return True, left
+        uuids.append(uuid)
+        return False, left
+
+    def remove(self, uuid: str | int) -> str | None:
+        """returns the group the connection has to leave, if that was its last subscription to it"""
+        group = self._groups.pop(uuid, None)
+        if group is None:
+            return None
+        uuids = self._uuids[group]
+        uuids.remove(uuid)
+        if uuids:
+            return None
+        del self._uuids[group]
+        return group
+
+    def subscribers(self, group: str) -> List[str | int]:
+        return self._uuids.get(group, [])
+
+    def groups(self) -> List[str]:
+        return list(self._uuids)
+
+    def __bool__(self):
+        return bool(self._groups)
@@ -33,6 +33,9 @@ CheckMethod = Callable[[HandlerArg], bool] | Callable[[HandlerArg], Awaitable[bo
 
 HydrateMethod = Callable[[HandlerArg], HydratedPayload] | Callable[[HandlerArg], Awaitable[HydratedPayload]]
 
+BatchHydrateMethod = Callable[[List[HandlerArg]], List[HydratedPayload]] | \
+                     Callable[[List[HandlerArg]], Awaitable[List[HydratedPayload]]]
+
 
 class SocketResult(TypedDict, Generic[HandlerPayload]):
     headers: Optional[Header]
@@ -42,4 +45,8 @@ class SocketResult(TypedDict, Generic[HandlerPayload]):
 
 HandlerMethod = Callable[[HandlerArg], SocketResult] | Callable[[HandlerArg], Awaitable[SocketResult]]
 
-DeHydrateMethod = Callable[[HandlerPayload], JsonValue] | Callable[[HandlerPayload], Awaitable[JsonValue]]
\ No newline at end of file
+DeHydrateMethod = Callable[[HandlerPayload], JsonValue] | Callable[[HandlerPayload], Awaitable[JsonValue]]
+
+GroupMethod = Callable[[HandlerArg], str] | Callable[[HandlerArg], Awaitable[str]]
+
+VersionMethod = Callable[[HandlerArg], str | int | None] | Callable[[HandlerArg], Awaitable[str | int | None]]
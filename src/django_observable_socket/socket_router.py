@@ -1,15 +1,33 @@
 import logging
+from contextlib import nullcontext
+from time import perf_counter
+from typing import Any, Callable, List
 
+from asgiref.sync import async_to_sync
 from channels.generic.websocket import JsonWebsocketConsumer
-from pydantic import ValidationError
+from pydantic import BaseModel
 
-from .classes import StatusCodes, RequestMessage, ResponseMessage, set_error, \
-    CallError, GenericRouteInfo, BaseRouter, enforce_routes
-from .classes.types import HandlerArg, SocketResult
-from .tools import route_to_method_name, result_is_successful
+from .classes import StatusCodes, RequestMessage, ResponseMessage, PreparedResponse, encode_payload, set_error, \
+    CallError, BaseRouter, enforce_routes, is_heartbeat, may_be_heartbeat, Subscriptions, UNSUBSCRIBE, PONG, \
+    CANCEL
+from .classes.codec import content_uuid
+from .classes.envelope import SlimRequest
+from .classes.dispatch import RouteEntry
+from .classes.limits import too_large
+from .classes.memo import store_writes
+from .classes.metrics import MetricsSink, BATCH
+from .classes.rate_limit import RateLimit
+from .classes.replay import replayable
+from .classes.stream import StreamedResponse, is_stream
+from .classes.delta import SUBSCRIPTION
+from .classes.conditional import ETAG, requested_version, content_version, with_etag
+from .classes.types import SocketResult
+from .tools import result_is_successful
 
 logger = logging.getLogger(__name__)
 
+_NO_METRICS = MetricsSink()
+
 
 class SocketRouterConsumer(JsonWebsocketConsumer, BaseRouter):
     from django.conf import settings
@@ -52,85 +70,430 @@ class SocketRouterConsumer(JsonWebsocketConsumer, BaseRouter):
 
     def connect(self):
         self._user = self.scope['user']
-        self.accept()
+        self.negotiate_compression()
+        self.accept(subprotocol=self.negotiate_codec())
 
-    def receive_json(self, content, **kwargs):
-        try:
-            message = RequestMessage(**content)
-            if message.route == 'PING':  # only heart-bit checks, response, so the client makes sure the connection is open
-                self.send_json(
-                    RequestMessage(
-                        route='PONG',
-                        uuid=message.uuid
-                    ).model_dump()
-                )
-                return
+    def disconnect(self, code):
+        state = self._state
+        if state is None:
+            return
+        self._state = None
+
+        if state.subscriptions:
+            for group in state.subscriptions.groups():
+                async_to_sync(self.channel_layer.group_discard)(group, self.channel_name)
+
+    @classmethod
+    def decode_json(cls, text_data):
+        return cls.codec.decode(text_data)
+
+    @classmethod
+    def encode_json(cls, content):
+        return cls.codec.encode(content)
+
+    def send_json(self, content, close=False):
+        """sends `content` encoded by the connection's codec (the negotiated one, see `codecs`), as a text or binary frame"""
+        self.send_frame(self.codec.encode(content))
+        if close:
+            self.close()
+
+    def send_frame(self, frame: str | bytes):
+        state = self._state
+        compression = state.compression if state is not None else None
+        if compression is not None and len(frame) >= compression.threshold:
+            frame = state.compress(frame.encode() if isinstance(frame, str) else frame)
+        if self.metrics is not None:
+            self.metrics.frame_sent(len(frame))
+        if isinstance(frame, str):
+            self.send(text_data=frame)
+        else:
+            self.send(bytes_data=frame)
 
-            # find route
-            route_info: GenericRouteInfo | None = self._get_route(message.route)
-            if not route_info:
-                self.send_json(
-                    message.error(error=set_error(CallError.RouteNotFound), status=StatusCodes.NOT_FOUND)
-                )
+    def send_message(self, message: ResponseMessage | PreparedResponse | None, route: str | None = None):
+        """`route` labels the encode time of the response"""
+        if message is None:
+            return
+        if route is None or self.metrics is None:
+            self.send_frame(self.codec.encode_message(message))
+            return
+        start = perf_counter()
+        frame = self.codec.encode_message(message)
+        self.metrics.phase(route, 'encode', perf_counter() - start)
+        self.send_frame(frame)
+
+    def receive(self, text_data=None, bytes_data=None, **kwargs):
+        frame = text_data if text_data is not None else bytes_data
+        if not frame:
+            return
+        if self.metrics is not None:
+            self.metrics.frame_received(len(frame))
+
+        # too large to be even decoded
+        limits = self.limits
+        if limits is not None and limits.frame_exceeds(len(frame)):
+            self.send_message(too_large(self.codec.head_uuid(frame)))
+            return
+
+        if may_be_heartbeat(frame):
+            try:
+                content = self.codec.decode(frame)
+            except (ValueError, TypeError):
+                content = None
+            if is_heartbeat(content):
+                self.send_frame(self.codec.pong(content['uuid']))
                 return
 
-            # find method
-            method_name = route_to_method_name(route_info.route)
+        # several requests in one frame
+        if self.codec.is_batch(frame):
             try:
-                method = getattr(self, method_name)  # if the method doesn't exist, an exception will be raised
-            except AttributeError:
-                self.send_json(
-                    message.error(status=StatusCodes.INTERNAL_SERVER_ERROR,
-                                  error=set_error(CallError.MethodNotImplemented))
-                )
+                contents = self.codec.decode(frame)
+            except RecursionError:  # nested deeper than the parser goes
+                self.send_message(too_large(self.codec.head_uuid(frame)))
+                return
+            except (ValueError, TypeError):
+                self.send_message(ResponseMessage.bad_format())
                 return
+            self.route_batch(contents)
+            return
 
+        # decoded first, to be checked against the limits or to build a slim envelope
+        if self.inspects_content:
             try:
-                inner_data = HandlerArg(scope=self.scope, headers=message.headers, payload=message.payload,
-                                        store=dict())
-
-                check_data = route_info.check_data
-                if check_data and not check_data(inner_data):
-                    self.send_json(
-                        message.error(status=StatusCodes.BAD_REQUEST, error=set_error(CallError.InvalidData))
-                    )
-                    return
-
-                check_access = route_info.check_access
-                if check_access and not check_access(inner_data):
-                    self.send_json(
-                        message.error(error=set_error(CallError.AccessDenied), status=StatusCodes.FORBIDDEN)
-                    )
-                    return
-
-                # hydrate the payload if the function is provided
-                hydrate = route_info.hydrate
-                if hydrate:
-                    inner_data.payload = hydrate(inner_data)
-
-                result: SocketResult = method(inner_data)
-
-                dehydrate = route_info.dehydrate
-                should_dehydrate: bool = dehydrate and result_is_successful(result.get('status', StatusCodes.OK))
-
-                if should_dehydrate:
-                    result.payload = dehydrate(result.payload)
-
-                self.send_json(
-                    message.respond(**result)
-                )
-            except Exception as e:
-                logger.error(str(e))
-                self.send_json(
-                    message.error(status=StatusCodes.INTERNAL_SERVER_ERROR,
-                                  error=set_error(CallError.InternalServerError))
-                )
-        except ValidationError:
-            response = {
-                'uuid': content.get('uuid', ''),
-                'status': StatusCodes.BAD_REQUEST,
-                'payload': set_error(CallError.BadRequestFormat)
-            }
-            self.send_json(
-                ResponseMessage(**response).model_dump()
-            )
+                content = self.codec.decode(frame)
+            except RecursionError:
+                self.send_message(too_large(self.codec.head_uuid(frame)))
+                return
+            except (ValueError, TypeError):
+                self.send_message(ResponseMessage.bad_format())
+                return
+            self.route_content(content, len(frame))
+            return
+
+        # validate the request straight from the frame
+        try:
+            message = self.codec.decode_request(frame)
+        except RecursionError:
+            self.send_message(too_large(self.codec.head_uuid(frame)))
+            return
+        except (ValueError, TypeError):
+            self.send_message(ResponseMessage.bad_format(self.codec.peek_uuid(frame)))
+            return
+
+        self.route_message(message)
+
+    def receive_json(self, content, **kwargs):
+        if isinstance(content, list):
+            self.route_batch(content)
+            return
+
+        # only heart-bit checks, response, so the client makes sure the connection is open
+        if is_heartbeat(content):
+            self.send_frame(self.codec.pong(content['uuid']))
+            return
+
+        self.route_content(content)
+
+    def throttle(self, limit: RateLimit) -> float:
+        """takes a token of `limit` for the current request, returns 0 if it may run, otherwise the seconds to wait"""
+        if limit.per_connection:
+            return self._take_token(limit)
+        key = limit.identify(self.scope)
+        return 0 if key is None else limit.backend.take(key, limit.rate, limit.capacity)
+
+    def add_subscription(self, uuid: str | int, group: str):
+        state = self.state
+        if state.subscriptions is None:
+            state.subscriptions = Subscriptions()
+        joined, left = state.subscriptions.add(uuid, group)
+        if left:
+            async_to_sync(self.channel_layer.group_discard)(left, self.channel_name)
+        if joined:
+            async_to_sync(self.channel_layer.group_add)(group, self.channel_name)
+
+    def remove_subscription(self, uuid: str | int):
+        state = self._state
+        if state is None:
+            return
+        group = state.subscriptions.remove(uuid) if state.subscriptions else None
+        if state.deltas is not None:
+            state.deltas.discard((SUBSCRIPTION, uuid))
+        if group:
+            async_to_sync(self.channel_layer.group_discard)(group, self.channel_name)
+
+    def observable_push(self, event):
+        """channel-layer handler of published updates, see `apublish`"""
+        if self._state is None or not self._state.subscriptions:
+            return
+        for response in self.push_responses(event):
+            self.send_message(response)
+
+    def observable_forget_checks(self, event):
+        """channel-layer handler of `FORGET_CHECKS` events"""
+        self.forget_checks(event.get('route'))
+
+    def _check(self, entry: RouteEntry, hook: str, method: Callable, arg):
+        """runs a check of the route, or recalls its result when the route has `memoize`"""
+        key, result = self.recall_check(entry, hook, arg)
+        if result is None:
+            if key is None:
+                return self._call(entry, hook, method, arg)
+            before = dict(arg.store)
+            result = self._call(entry, hook, method, arg)
+            self.remember_check(entry, key, result, store_writes(before, arg.store))
+        return result
+
+    def _call(self, entry: RouteEntry, hook: str, method: Callable, *args):
+        """runs a hook of the route, timed when `metrics` is set"""
+        metrics = self.metrics
+        if metrics is None:
+            return method(*args)
+        start = perf_counter()
+        try:
+            return method(*args)
+        finally:
+            metrics.phase(entry.route, hook, perf_counter() - start)
+
+    def route_batch(self, contents: List[Any]):
+        """runs the requests of a batch and answers them all in one frame"""
+        size = self.max_batch_size
+        if self.observed:
+            responses = [self._observe(content.get('route') if isinstance(content, dict) else None,
+                                       content_uuid(content), self.handle_content, (content,), send=False)
+                         for content in contents[:size]]
+        else:
+            responses = [self.handle_content(content) for content in contents[:size]]
+        responses = [response for response in responses if response is not None]
+        # a batch is answered in one frame, streams included
+        for i, response in enumerate(responses):
+            if isinstance(response, StreamedResponse):
+                try:
+                    responses[i] = response.collect()
+                except Exception:
+                    logger.exception('streaming the response of request %r failed', response.uuid)
+                    responses[i] = ResponseMessage(uuid=response.uuid, status=StatusCodes.INTERNAL_SERVER_ERROR,
+                                                   payload=set_error(CallError.InternalServerError))
+        responses.extend(ResponseMessage.batch_too_large(content_uuid(content)) for content in contents[size:])
+        start = perf_counter()
+        frame = self.codec.encode_messages(responses)
+        if self.metrics is not None:
+            self.metrics.phase(BATCH, 'encode', perf_counter() - start)
+        self.send_frame(frame)
+
+    def handle_content(self, content: Any, size: int = 0) \
+            -> BaseModel | PreparedResponse | StreamedResponse | None:
+        """pipeline of a single, already decoded, request, `size` is the length of its frame (0 inside a batch)"""
+        if is_heartbeat(content):
+            return RequestMessage(route=PONG, uuid=content['uuid'])
+
+        if self.content_exceeds_limits(content, size):
+            return too_large(content_uuid(content))
+
+        try:
+            message = self.parse_request(content)
+        except ValueError:
+            return ResponseMessage.bad_format(content_uuid(content))
+
+        return self.handle_message(message)
+
+    def route_content(self, content: Any, size: int = 0):
+        if self.observed:
+            route = content.get('route') if isinstance(content, dict) else None
+            self._observe(route, content_uuid(content), self.handle_content, (content, size))
+        else:
+            self.send_response(self.handle_content(content, size))
+
+    def route_message(self, message: RequestMessage | SlimRequest):
+        if self.observed:
+            self._observe(message.route, message.uuid, self.handle_message, (message,))
+        else:
+            self.send_response(self.handle_message(message))
+
+    def _observe(self, route: Any, uuid: str | int, handle: Callable, args: tuple, send: bool = True):
+        """runs (and sends) a request measured by `metrics` and traced by `tracer`"""
+        route = self.metric_route(route)
+        metrics = self.metrics or _NO_METRICS
+        tracer = self.tracer
+        span = tracer.start_as_current_span(route, attributes={'socket.route': route, 'socket.uuid': uuid}) \
+            if tracer is not None else nullcontext()
+        status = None
+        metrics.request_started(route)
+        start = perf_counter()
+        try:
+            with span as current:
+                response = handle(*args)
+                if send:
+                    self.send_response(response, route)
+                status = getattr(response, 'status', StatusCodes.OK) if response is not None else None
+                if current is not None and status is not None:
+                    current.set_attribute('socket.status', status)
+            return response
+        finally:
+            metrics.request_finished(route, status, perf_counter() - start)
+
+    def send_response(self, response: BaseModel | PreparedResponse | StreamedResponse | None,
+                      route: str | None = None):
+        if isinstance(response, StreamedResponse):
+            self.send_stream(response)
+        else:
+            self.send_message(response, route)
+
+    def send_stream(self, response: StreamedResponse):
+        count = 0
+        try:
+            for chunk in response.chunks():
+                self.send_message(response.chunk(count, chunk))
+                count += 1
+        except Exception:
+            logger.exception('streaming the response of request %r failed', response.uuid)
+            self.send_message(response.failed(count))
+            return
+        self.send_message(response.end(count))
+
+    def handle_message(self, message: RequestMessage | SlimRequest) \
+            -> ResponseMessage | PreparedResponse | StreamedResponse | None:
+        """runs the whole pipeline of a request and returns its response"""
+        if message.route == UNSUBSCRIBE:
+            self.remove_subscription(message.uuid)
+            return ResponseMessage(uuid=message.uuid, status=StatusCodes.NO_CONTENT)
+
+        # requests run one after another, whatever the client cancels has already been answered
+        if message.route == CANCEL:
+            return ResponseMessage(uuid=message.uuid, status=StatusCodes.NO_CONTENT)
+
+        if self.rate_limit is not None:
+            retry_after = self.throttle(self.rate_limit)
+            if retry_after:
+                return ResponseMessage.too_many_requests(message.uuid, retry_after)
+
+        # find route
+        entry = self._dispatch.get(message.route)
+        if entry is None:
+            return message.build_error(error=set_error(CallError.RouteNotFound), status=StatusCodes.NOT_FOUND)
+
+        idempotency = entry.info.idempotency
+        if idempotency is not None:
+            key = idempotency.identify(self.scope, entry.route, message.uuid)
+            if key is not None:
+                return self.replay(message, entry, key)
+        return self.call_route(message, entry)
+
+    def replay(self, message: RequestMessage | SlimRequest, entry: RouteEntry, key: str) \
+            -> ResponseMessage | PreparedResponse | StreamedResponse | None:
+        """
+            answers a retried request with the response of the first one. requests of sync consumers don't overlap
+            on a worker, so a duplicate never finds the first request still running
+        """
+        idempotency = entry.info.idempotency
+        stored = idempotency.store.get(key)
+        if stored is not None:
+            return PreparedResponse(message.uuid, *stored)
+
+        response = self.call_route(message, entry)
+        stored = replayable(response)
+        if stored is not None:
+            idempotency.store.set(key, stored)
+        return response
+
+    def call_route(self, message: RequestMessage | SlimRequest, entry: RouteEntry) \
+            -> ResponseMessage | PreparedResponse | StreamedResponse | None:
+        """runs the route within its rate limit"""
+        rate_limit = entry.info.rate_limit
+        if rate_limit is not None:
+            retry_after = self.throttle(rate_limit)
+            if retry_after:
+                return ResponseMessage.too_many_requests(message.uuid, retry_after)
+        return self.run_route(message, entry)
+
+    def run_route(self, message: RequestMessage | SlimRequest, entry: RouteEntry) \
+            -> ResponseMessage | PreparedResponse | StreamedResponse | None:
+        """runs the hooks and the handler of the route"""
+        try:
+            inner_data = self.handler_arg(message)
+
+            check_data = entry.check_data
+            if check_data and not self._check(entry, 'check_data', check_data, inner_data):
+                return message.build_error(status=StatusCodes.BAD_REQUEST, error=set_error(CallError.InvalidData))
+
+            check_access = entry.check_access
+            if check_access and not self._check(entry, 'check_access', check_access, inner_data):
+                return message.build_error(error=set_error(CallError.AccessDenied), status=StatusCodes.FORBIDDEN)
+
+            # nothing to send if the client already has the current version
+            requested = requested_version(message.headers)
+            etag = None
+            version = entry.version
+            if version:
+                etag = version(inner_data)
+                if etag is not None:
+                    etag = str(etag)
+                    if etag == requested:
+                        return ResponseMessage.not_modified(message.uuid, etag)
+
+            # the resource whose last payload the response may be a patch of
+            delta = entry.info.delta
+            delta_key = (entry.route, delta.make_key(inner_data)) if delta is not None else None
+
+            # serve the cached response if there is one
+            cache = entry.info.cache
+            cache_key = cache.make_key(inner_data) if cache is not None else None
+            if cache_key is not None:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    cached_etag = cached[2].get(ETAG) if cached[2] else None
+                    if cached_etag is not None and cached_etag == requested:
+                        return ResponseMessage.not_modified(message.uuid, cached_etag)
+                    return PreparedResponse(message.uuid, *cached)
+
+            # hydrate the payload if the function is provided
+            hydrate = entry.hydrate
+            if hydrate:
+                inner_data.payload = self._call(entry, 'hydrate', hydrate, inner_data)
+            elif entry.batch_hydrate:
+                # requests are served one at a time here, there is nothing to coalesce them with
+                inner_data.payload = self._call(entry, 'hydrate', entry.batch_hydrate, [inner_data])[0]
+
+            # resolve the group to observe if the route is subscribable
+            subscribe = entry.subscribe
+            group = subscribe(inner_data) if subscribe else None
+
+            result: SocketResult = self._call(entry, 'handler', entry.handler, self, inner_data)
+
+            dehydrate = entry.dehydrate
+            status = result.get('status', StatusCodes.OK)
+            is_successful = result_is_successful(status)
+
+            if dehydrate and is_successful:
+                result['payload'] = self._call(entry, 'dehydrate', dehydrate, result.get('payload'))
+
+            # join before responding, so no update published after the response gets lost
+            if group and is_successful:
+                self.add_subscription(message.uuid, group)
+
+            # iterators are sent in chunks, as they're produced
+            if is_successful and is_stream(result.get('payload')):
+                return StreamedResponse(message.uuid, status, result['payload'], result.get('headers'),
+                                        entry.info.stream_chunk_size)
+
+            if is_successful and delta is not None:
+                return self.delta_response(message, delta_key, status, result, etag, bool(group))
+
+            if is_successful and (cache_key is not None or (etag is None and entry.info.etag)):
+                # from here on the payload is only needed encoded: to hash it, to cache it and to send it
+                encoded = encode_payload(result.get('payload'))
+                if etag is None and entry.info.etag:
+                    etag = content_version(encoded)
+                cached = (status, encoded, with_etag(result.get('headers'), etag) if etag else result.get('headers'))
+                if cache_key is not None:
+                    cache.set(cache_key, cached)
+                if etag is not None and etag == requested:
+                    return ResponseMessage.not_modified(message.uuid, etag)
+                return PreparedResponse(message.uuid, *cached)
+
+            if etag is not None and is_successful:
+                result['headers'] = with_etag(result.get('headers'), etag)
+
+            return message.build_response(result)
+        except Exception:
+            logger.exception('request %r to route %s failed', message.uuid, message.route)
+            return message.build_error(status=StatusCodes.INTERNAL_SERVER_ERROR,
+                                      error=set_error(CallError.InternalServerError))
@@ -0,0 +1,20 @@
+from channels.testing import WebsocketCommunicator
+
+
+class User:
+    """an authenticated user, without touching the database"""
+    is_authenticated = True
+
+    def __init__(self, pk: int):
+        self.pk = pk
+
+
+async def connect(consumer, path: str = '/ws/', user=None, **kwargs) -> WebsocketCommunicator:
+    """a connected communicator of `consumer`, anonymous unless `user` is given"""
+    communicator = WebsocketCommunicator(consumer.as_asgi(), path, **kwargs)
+    communicator.scope['user'] = user
+    communicator.scope['client'] = ('127.0.0.1', 50000)
+    connected, subprotocol = await communicator.connect()
+    assert connected
+    communicator.subprotocol = subprotocol
+    return communicator
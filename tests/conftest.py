@@ -0,0 +1,24 @@
+"""
+Django configuration of the test suite: an in-memory database, channel layer and cache. the test database is
+created once for the session, in shared memory, so threads of the execution pools see the same tables.
+"""
+import django
+from django.conf import settings
+
+
+def pytest_configure(config):
+    if settings.configured:
+        return
+    settings.configure(
+        INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'channels'],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        LOGGING_CONFIG=None,
+    )
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
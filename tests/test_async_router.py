@@ -0,0 +1,135 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from django_observable_socket import AsyncSocketRouterConsumer
+from django_observable_socket.classes import Idempotency, StatusCodes
+
+from .communicator import User, connect
+
+
+class Saturation(IsolatedAsyncioTestCase):
+    class Consumer(AsyncSocketRouterConsumer):
+        concurrent_requests = True
+        max_in_flight = 1
+        max_queued = 1
+        _routes = [{'route': 'slow'}]
+
+        async def on_slow(self, arg):
+            await asyncio.sleep(0.2)
+            return {'payload': arg.payload}
+
+    async def test_requests_above_the_queue_are_unavailable(self):
+        communicator = await connect(self.Consumer)
+        for uuid in (1, 2, 3):
+            await communicator.send_json_to({'uuid': uuid, 'route': 'slow', 'payload': uuid})
+        shed = await communicator.receive_json_from()
+        self.assertEqual((shed['uuid'], shed['status']), (3, StatusCodes.SERVICE_UNAVAILABLE))
+        self.assertEqual(shed['headers'], {'Retry-After': 1})
+        answered = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual([(response['uuid'], response['payload']) for response in answered], [(1, 1), (2, 2)])
+        await communicator.disconnect()
+
+    async def test_heartbeats_are_answered_while_saturated(self):
+        communicator = await connect(self.Consumer)
+        await communicator.send_json_to({'uuid': 1, 'route': 'slow', 'payload': 1})
+        await communicator.send_json_to({'uuid': 'ping', 'route': 'PING'})
+        pong = await communicator.receive_json_from()
+        self.assertEqual((pong['uuid'], pong['route']), ('ping', 'PONG'))
+        self.assertEqual((await communicator.receive_json_from())['uuid'], 1)
+        await communicator.disconnect()
+
+
+class Cancel(IsolatedAsyncioTestCase):
+    class Consumer(AsyncSocketRouterConsumer):
+        concurrent_requests = True
+        max_in_flight = 1
+        _routes = [{'route': 'slow'}]
+
+        async def on_slow(self, arg):
+            await asyncio.sleep(0.2)
+            return {'payload': arg.payload}
+
+    async def test_cancelled_requests_are_never_answered(self):
+        communicator = await connect(self.Consumer)
+        await communicator.send_json_to({'uuid': 1, 'route': 'slow', 'payload': 1})
+        # waiting for the slot taken by the first one
+        await communicator.send_json_to({'uuid': 2, 'route': 'slow', 'payload': 2})
+        for uuid in (1, 2):
+            await communicator.send_json_to({'uuid': uuid, 'route': 'CANCEL'})
+            self.assertEqual(await communicator.receive_json_from(),
+                             {'uuid': uuid, 'status': StatusCodes.NO_CONTENT, 'headers': None, 'payload': None})
+        self.assertTrue(await communicator.receive_nothing(0.3))
+
+        await communicator.send_json_to({'uuid': 3, 'route': 'slow', 'payload': 3})
+        self.assertEqual((await communicator.receive_json_from())['payload'], 3)
+        await communicator.disconnect()
+
+    async def test_unknown_uuids_are_acknowledged(self):
+        communicator = await connect(self.Consumer)
+        await communicator.send_json_to({'uuid': 'none', 'route': 'CANCEL'})
+        self.assertEqual((await communicator.receive_json_from())['status'], StatusCodes.NO_CONTENT)
+        await communicator.disconnect()
+
+
+class Timeout(IsolatedAsyncioTestCase):
+    class Consumer(AsyncSocketRouterConsumer):
+        _routes = [{'route': 'slow', 'timeout': 0.05}, {'route': 'fast', 'timeout': 1}]
+
+        async def on_slow(self, arg):
+            await asyncio.sleep(1)
+            return {'payload': 'late'}
+
+        async def on_fast(self, arg):
+            return {'payload': 'early'}
+
+    async def test_routes_running_longer_are_answered_with_gateway_timeout(self):
+        communicator = await connect(self.Consumer)
+        await communicator.send_json_to({'uuid': 1, 'route': 'slow'})
+        response = await communicator.receive_json_from()
+        self.assertEqual((response['uuid'], response['status']), (1, StatusCodes.GATEWAY_TIMEOUT))
+        await communicator.send_json_to({'uuid': 2, 'route': 'fast'})
+        self.assertEqual((await communicator.receive_json_from())['payload'], 'early')
+        await communicator.disconnect()
+
+
+class Replay(IsolatedAsyncioTestCase):
+    def consumer(self):
+        runs = self.runs = []
+
+        class Consumer(AsyncSocketRouterConsumer):
+            concurrent_requests = True
+            _routes = [{'route': 'post', 'idempotency': Idempotency()}]
+
+            async def on_post(self, arg):
+                runs.append(arg.payload)
+                await asyncio.sleep(0.05)
+                return {'payload': len(runs)}
+
+        return Consumer
+
+    async def test_retries_run_once(self):
+        consumer = self.consumer()
+        first = await connect(consumer, user=User(1))
+        retry = await connect(consumer, user=User(1))
+        # the retry arrives while the first request still runs
+        await first.send_json_to({'uuid': 'a', 'route': 'post', 'payload': 'x'})
+        await retry.send_json_to({'uuid': 'a', 'route': 'post', 'payload': 'x'})
+        self.assertEqual((await first.receive_json_from())['payload'], 1)
+        self.assertEqual((await retry.receive_json_from())['payload'], 1)
+        # and once it's done
+        await retry.send_json_to({'uuid': 'a', 'route': 'post', 'payload': 'x'})
+        self.assertEqual((await retry.receive_json_from())['payload'], 1)
+        self.assertEqual(self.runs, ['x'])
+
+        await retry.send_json_to({'uuid': 'b', 'route': 'post', 'payload': 'y'})
+        self.assertEqual((await retry.receive_json_from())['payload'], 2)
+        await first.disconnect()
+        await retry.disconnect()
+
+    async def test_anonymous_requests_are_never_replayed(self):
+        communicator = await connect(self.consumer())
+        for _ in range(2):
+            await communicator.send_json_to({'uuid': 'a', 'route': 'post', 'payload': 'x'})
+            await communicator.receive_json_from()
+        self.assertEqual(self.runs, ['x', 'x'])
+        await communicator.disconnect()
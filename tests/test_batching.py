@@ -0,0 +1,48 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from django_observable_socket import AsyncSocketRouterConsumer
+
+from .communicator import connect
+
+
+def consumer(batches: list, **route):
+    def load(args):
+        batches.append(len(args))
+        return [arg.payload * 10 for arg in args]
+
+    return type('Batched', (AsyncSocketRouterConsumer,), {
+        'concurrent_requests': True,
+        '_routes': [{'route': 'load', 'batch_hydrate': load, **route}],
+        'on_load': lambda self, arg: {'payload': arg.payload},
+    })
+
+
+class BatchedHydration(IsolatedAsyncioTestCase):
+    async def test_requests_of_separate_frames(self):
+        batches = []
+        communicator = await connect(consumer(batches))
+        for uuid in range(3):
+            await communicator.send_json_to({'uuid': uuid, 'route': 'load', 'payload': uuid})
+            await asyncio.sleep(0.001)
+        responses = sorted([await communicator.receive_json_from() for _ in range(3)], key=lambda r: r['uuid'])
+        self.assertEqual([response['payload'] for response in responses], [0, 10, 20])
+        self.assertEqual(batches, [3])
+        await communicator.disconnect()
+
+    async def test_requests_of_a_batch_frame_without_window(self):
+        batches = []
+        communicator = await connect(consumer(batches, batch_window=0))
+        await communicator.send_json_to([{'uuid': uuid, 'route': 'load', 'payload': uuid} for uuid in range(3)])
+        responses = await communicator.receive_json_from()
+        self.assertEqual([response['payload'] for response in responses], [0, 10, 20])
+        self.assertEqual(batches, [3])
+        await communicator.disconnect()
+
+    async def test_max_size(self):
+        batches = []
+        communicator = await connect(consumer(batches, batch_max_size=2))
+        await communicator.send_json_to([{'uuid': uuid, 'route': 'load', 'payload': uuid} for uuid in range(5)])
+        await communicator.receive_json_from()
+        self.assertEqual(batches, [2, 2, 1])
+        await communicator.disconnect()
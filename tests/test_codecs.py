@@ -0,0 +1,119 @@
+import json
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+import msgpack
+
+from django_observable_socket import AsyncSocketRouterConsumer, SocketRouterConsumer
+from django_observable_socket.classes import MsgpackCodec, PreparedResponse, ResponseMessage, StatusCodes, \
+    encode_payload
+from django_observable_socket.classes.codec import Codec
+
+from .communicator import connect
+
+
+class PlainCodec(Codec):
+    """a codec implementing only what it has to"""
+
+    def decode(self, data):
+        return json.loads(data)
+
+    def encode(self, content):
+        return json.dumps(content)
+
+
+def consumers(codecs=None):
+    for base in (AsyncSocketRouterConsumer, SocketRouterConsumer):
+        yield type(f'Codec{base.__name__}', (base,), {
+            'codecs': codecs or {'msgpack': MsgpackCodec()},
+            '_routes': [{'route': 'series'}],
+            'on_series': lambda self, arg: {'payload': [1.5, arg.payload]},
+        })
+
+
+class Negotiation(IsolatedAsyncioTestCase):
+    async def request(self, communicator, binary: bool):
+        message = {'uuid': 1, 'route': 'series', 'payload': 2}
+        if binary:
+            await communicator.send_to(bytes_data=msgpack.packb(message))
+            output = await communicator.receive_output()
+            return msgpack.unpackb(output['bytes'])
+        await communicator.send_to(text_data=json.dumps(message))
+        output = await communicator.receive_output()
+        return json.loads(output['text'])
+
+    async def test_subprotocol(self):
+        for consumer in consumers():
+            communicator = await connect(consumer, subprotocols=['observable-socket.msgpack'])
+            self.assertEqual(communicator.subprotocol, 'observable-socket.msgpack')
+            self.assertEqual((await self.request(communicator, True))['payload'], [1.5, 2])
+            await communicator.disconnect()
+
+    async def test_query_parameter(self):
+        for consumer in consumers():
+            communicator = await connect(consumer, '/ws/?codec=msgpack')
+            self.assertEqual((await self.request(communicator, True))['payload'], [1.5, 2])
+            await communicator.send_to(bytes_data=msgpack.packb({'uuid': 'ping', 'route': 'PING'}))
+            pong = msgpack.unpackb((await communicator.receive_output())['bytes'])
+            self.assertEqual((pong['uuid'], pong['route']), ('ping', 'PONG'))
+            await communicator.disconnect()
+
+    async def test_json_by_default(self):
+        for consumer in consumers():
+            communicator = await connect(consumer, '/ws/?codec=unknown')
+            self.assertEqual((await self.request(communicator, False))['payload'], [1.5, 2])
+            await communicator.disconnect()
+
+    async def test_undecodable_frames_are_bad_requests(self):
+        for consumer in consumers():
+            communicator = await connect(consumer, '/ws/?codec=msgpack')
+            await communicator.send_to(bytes_data=b'\xc1garbage')
+            response = msgpack.unpackb((await communicator.receive_output())['bytes'])
+            self.assertEqual(response['status'], StatusCodes.BAD_REQUEST)
+            await communicator.disconnect()
+
+    async def test_codecs_of_decode_and_encode(self):
+        for consumer in consumers({'plain': PlainCodec()}):
+            communicator = await connect(consumer, '/ws/?codec=plain')
+            self.assertEqual((await self.request(communicator, False))['payload'], [1.5, 2])
+            await communicator.send_json_to([{'uuid': 1, 'route': 'series', 'payload': 1},
+                                             {'uuid': 2, 'route': 'series', 'payload': 2}])
+            responses = await communicator.receive_json_from()
+            self.assertEqual([response['payload'] for response in responses], [[1.5, 1], [1.5, 2]])
+            await communicator.send_to(text_data='{"uuid": 3')
+            self.assertEqual((await communicator.receive_json_from())['status'], StatusCodes.BAD_REQUEST)
+            await communicator.disconnect()
+
+
+class PreparedMsgpack(TestCase):
+    def test_prepared_responses_dump_like_messages(self):
+        codec = MsgpackCodec()
+        payload = {'rows': [1.5, 'a', None], 'total': 3}
+        for headers in (None, {'ETag': 'v1'}):
+            prepared = PreparedResponse('a', StatusCodes.OK, encode_payload(payload), headers)
+            message = ResponseMessage(uuid='a', status=StatusCodes.OK, payload=payload, headers=headers)
+            self.assertEqual(msgpack.unpackb(codec.encode_message(prepared)), message.model_dump())
+        self.assertEqual(msgpack.unpackb(codec.encode_messages([prepared, message])), [message.model_dump()] * 2)
+        self.assertEqual(msgpack.unpackb(codec.encode_messages([message] * 20)), [message.model_dump()] * 20)
+
+
+class PublishedMsgpack(IsolatedAsyncioTestCase):
+    async def test_updates_are_converted_once_per_group(self):
+        codec = MsgpackCodec()
+        consumer = type('Watch', (AsyncSocketRouterConsumer,), {
+            'codecs': {'msgpack': codec},
+            '_routes': [{'route': 'watch', 'subscribe': lambda arg: 'watched'}],
+            'on_watch': lambda self, arg: {'payload': None},
+        })
+        communicators = []
+        for uuid in range(3):
+            communicator = await connect(consumer, '/ws/?codec=msgpack')
+            await communicator.send_to(bytes_data=msgpack.packb({'uuid': uuid, 'route': 'watch'}))
+            await communicator.receive_output()
+            communicators.append(communicator)
+
+        await consumer.apublish('watch', 'watched', {'rows': list(range(100))})
+        for uuid, communicator in enumerate(communicators):
+            pushed = msgpack.unpackb((await communicator.receive_output())['bytes'])
+            self.assertEqual((pushed['uuid'], pushed['payload']), (uuid, {'rows': list(range(100))}))
+            await communicator.disconnect()
+        self.assertEqual(codec._packed_payload.cache_info().misses, 1)
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import time
+import zlib
+from unittest import IsolatedAsyncioTestCase
+
+import zstandard
+
+from django_observable_socket import AsyncSocketRouterConsumer, SocketRouterConsumer
+from django_observable_socket.classes import COMPRESSED_FRAME, StatusCodes, ZlibCompression, ZstdCompression
+
+from .communicator import connect
+
+ROWS = [{'id': i, 'title': f'title {i}', 'tags': ['a', 'b']} for i in range(300)]
+
+DECOMPRESSORS = {
+    'deflate': lambda: zlib.decompressobj(-15),
+    'zstd': lambda: zstandard.ZstdDecompressor().decompressobj(),
+}
+
+
+def consumers():
+    for base in (AsyncSocketRouterConsumer, SocketRouterConsumer):
+        yield type(f'Compressed{base.__name__}', (base,), {
+            'compressions': {'deflate': ZlibCompression(threshold=200, offload_threshold=8000),
+                             'zstd': ZstdCompression(threshold=200)},
+            '_routes': [{'route': 'rows'}, {'route': 'export', 'stream_chunk_size': 100}],
+            'on_rows': lambda self, arg: {'payload': ROWS[:arg.payload]},
+            'on_export': lambda self, arg: {'payload': iter(ROWS)},
+        })
+
+
+class Reader:
+    """reads the frames of a connection, decompressing them with a single stream like a client does"""
+
+    def __init__(self, communicator, compression: str):
+        self.communicator = communicator
+        self.decompressor = DECOMPRESSORS[compression]()
+
+    async def receive(self) -> dict:
+        output = await self.communicator.receive_output()
+        if 'bytes' in output and output['bytes']:
+            data = output['bytes']
+            assert data[:1] == COMPRESSED_FRAME
+            return json.loads(self.decompressor.decompress(data[1:]))
+        return json.loads(output['text'])
+
+
+class CompressedResponses(IsolatedAsyncioTestCase):
+    async def test_frames_share_one_stream(self):
+        for consumer in consumers():
+            for compression in DECOMPRESSORS:
+                communicator = await connect(consumer, f'/ws/?compression={compression}')
+                reader = Reader(communicator, compression)
+                # small, large (offloaded by the async consumer), and large again on the same stream
+                for uuid, count in enumerate((1, 300, 300, 2)):
+                    await communicator.send_json_to({'uuid': uuid, 'route': 'rows', 'payload': count})
+                    self.assertEqual((await reader.receive())['payload'], ROWS[:count])
+                await communicator.disconnect()
+
+    async def test_streams(self):
+        for consumer in consumers():
+            for compression in DECOMPRESSORS:
+                communicator = await connect(consumer, f'/ws/?compression={compression}')
+                reader = Reader(communicator, compression)
+                await communicator.send_json_to({'uuid': 'e', 'route': 'export'})
+                rows = []
+                for index in range(3):
+                    chunk = await reader.receive()
+                    self.assertEqual((chunk['status'], chunk['headers']), (StatusCodes.PARTIAL_CONTENT, {'Chunk': index}))
+                    rows.extend(chunk['payload'])
+                end = await reader.receive()
+                self.assertEqual((end['status'], end['headers']), (StatusCodes.OK, {'Chunks': 3}))
+                self.assertEqual(rows, ROWS)
+                await communicator.disconnect()
+
+
+class SlowCompression(ZlibCompression):
+    def context(self):
+        context = super().context()
+
+        def compress(data: bytes) -> bytes:
+            time.sleep(0.2)
+            return context(data)
+        return compress
+
+
+class CancelledCompression(IsolatedAsyncioTestCase):
+    class Consumer(AsyncSocketRouterConsumer):
+        concurrent_requests = True
+        compressions = {'deflate': SlowCompression(threshold=200, offload_threshold=200)}
+        _routes = [{'route': 'rows'}]
+
+        def on_rows(self, arg):
+            return {'payload': ROWS}
+
+    async def test_frames_after_a_request_cancelled_while_compressing_decompress(self):
+        communicator = await connect(self.Consumer, '/ws/?compression=deflate')
+        reader = Reader(communicator, 'deflate')
+        await communicator.send_json_to({'uuid': 1, 'route': 'rows'})
+        await asyncio.sleep(0.05)
+        await communicator.send_json_to({'uuid': 1, 'route': 'CANCEL'})
+        self.assertEqual((await reader.receive())['status'], StatusCodes.NO_CONTENT)
+        await communicator.send_json_to({'uuid': 2, 'route': 'rows'})
+        # the frame being compressed is still sent, so the stream goes on
+        self.assertEqual((await reader.receive())['uuid'], 1)
+        response = await reader.receive()
+        self.assertEqual((response['uuid'], response['payload']), (2, ROWS))
+        await communicator.disconnect()
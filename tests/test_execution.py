@@ -0,0 +1,66 @@
+import threading
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from django.contrib.auth.models import Group
+from django.db import close_old_connections
+
+from django_observable_socket import AsyncSocketRouterConsumer
+
+from .communicator import connect
+
+
+def count_groups(arg):
+    return Group.objects.count()
+
+
+BATCHES = []
+
+
+def count_groups_of(args):
+    BATCHES.append(len(args))
+    return [Group.objects.count() for _ in args]
+
+
+class Consumer(AsyncSocketRouterConsumer):
+    concurrent_requests = True
+    execution = {'hydrate': 'thread'}
+    _routes = [{'route': 'single', 'hydrate': count_groups},
+               {'route': 'batched', 'batch_hydrate': count_groups_of, 'batch_window': 0.02}]
+
+    def on_single(self, arg):
+        return {'payload': arg.payload}
+
+    def on_batched(self, arg):
+        return {'payload': arg.payload}
+
+
+class DatabaseConnections(IsolatedAsyncioTestCase):
+    async def closed_around(self, route: str, requests: int) -> int:
+        """the times the pool's threads closed their old database connections while serving `requests` requests"""
+        loop_thread = threading.get_ident()
+        calls = []
+
+        def closing():
+            if threading.get_ident() != loop_thread:
+                calls.append(threading.get_ident())
+            close_old_connections()
+
+        communicator = await connect(Consumer)
+        with patch('django_observable_socket.classes.execution.close_old_connections', closing):
+            for uuid in range(requests):
+                await communicator.send_json_to({'uuid': uuid, 'route': route})
+            for _ in range(requests):
+                self.assertEqual((await communicator.receive_json_from())['payload'], 0)
+        await communicator.disconnect()
+        return len(calls)
+
+    async def test_offloaded_hooks(self):
+        self.assertEqual(await self.closed_around('single', 3), 6)
+
+    async def test_offloaded_batches(self):
+        BATCHES.clear()
+        closed = await self.closed_around('batched', 3)
+        self.assertEqual(sum(BATCHES), 3)
+        self.assertEqual(closed, 2 * len(BATCHES))
+
@@ -0,0 +1,44 @@
+from unittest import IsolatedAsyncioTestCase
+
+from django_observable_socket import AsyncSocketRouterConsumer, SocketRouterConsumer
+from django_observable_socket.classes import FrameLimits, StatusCodes
+
+from .communicator import connect
+
+DEPTH = 100000
+
+
+def consumers(limits: FrameLimits | None = None):
+    for base in (AsyncSocketRouterConsumer, SocketRouterConsumer):
+        yield type(f'Limited{base.__name__}', (base,), {
+            'limits': limits,
+            '_routes': [{'route': 'echo'}],
+            'on_echo': lambda self, arg: {'payload': arg.payload},
+        })
+
+
+class DeepFrames(IsolatedAsyncioTestCase):
+    async def assert_survives(self, consumer, frame: str, status: int, uuid: str | int = ''):
+        communicator = await connect(consumer)
+        await communicator.send_to(text_data=frame)
+        response = await communicator.receive_json_from()
+        self.assertEqual((response['uuid'], response['status']), (uuid, status))
+        await communicator.send_json_to({'uuid': 2, 'route': 'echo', 'payload': [1]})
+        self.assertEqual((await communicator.receive_json_from())['payload'], [1])
+        await communicator.disconnect()
+
+    async def test_batches(self):
+        for consumer in consumers():
+            await self.assert_survives(consumer, '[' * DEPTH + ']' * DEPTH, StatusCodes.PAYLOAD_TOO_LARGE)
+
+    async def test_requests(self):
+        frame = '{"uuid": 1, "route": "echo", "payload": ' + '[' * DEPTH + ']' * DEPTH + '}'
+        for consumer in consumers():
+            await self.assert_survives(consumer, frame, StatusCodes.BAD_REQUEST)
+        for consumer in consumers(FrameLimits(payload_depth=8)):
+            await self.assert_survives(consumer, frame, StatusCodes.PAYLOAD_TOO_LARGE, 1)
+
+    async def test_payload_depth(self):
+        frame = '{"uuid": 1, "route": "echo", "payload": ' + '[' * 9 + ']' * 9 + '}'
+        for consumer in consumers(FrameLimits(payload_depth=8)):
+            await self.assert_survives(consumer, frame, StatusCodes.PAYLOAD_TOO_LARGE, 1)
@@ -0,0 +1,55 @@
+from unittest import IsolatedAsyncioTestCase
+
+from django_observable_socket import AsyncSocketRouterConsumer, SocketRouterConsumer
+from django_observable_socket.classes import CheckMemo, StatusCodes
+
+from .communicator import connect
+
+
+def consumers(checks: list):
+    def can_read(arg):
+        checks.append(arg.payload)
+        arg.store['article'] = {'id': arg.payload}
+        return arg.payload != 0
+
+    for base in (AsyncSocketRouterConsumer, SocketRouterConsumer):
+        yield type(f'Memo{base.__name__}', (base,), {
+            '_routes': [{'route': 'read', 'check_access': can_read, 'memoize': CheckMemo()}],
+            'on_read': lambda self, arg: {'payload': arg.store['article']},
+        })
+
+
+class MemoizedChecks(IsolatedAsyncioTestCase):
+    async def test_reused_results_bring_back_the_store(self):
+        checks = []
+        for consumer in consumers(checks):
+            checks.clear()
+            communicator = await connect(consumer)
+            for uuid, payload in enumerate((1, 1, 2, 1)):
+                await communicator.send_json_to({'uuid': uuid, 'route': 'read', 'payload': payload})
+                response = await communicator.receive_json_from()
+                self.assertEqual((response['status'], response['payload']), (StatusCodes.OK, {'id': payload}))
+            self.assertEqual(checks, [1, 2])
+            await communicator.disconnect()
+
+    async def test_failed_checks_are_remembered(self):
+        checks = []
+        for consumer in consumers(checks):
+            checks.clear()
+            communicator = await connect(consumer)
+            for uuid in range(2):
+                await communicator.send_json_to({'uuid': uuid, 'route': 'read', 'payload': 0})
+                self.assertEqual((await communicator.receive_json_from())['status'], StatusCodes.FORBIDDEN)
+            self.assertEqual(checks, [0])
+            await communicator.disconnect()
+
+    async def test_results_are_per_connection(self):
+        checks = []
+        for consumer in consumers(checks):
+            checks.clear()
+            for uuid in range(2):
+                communicator = await connect(consumer)
+                await communicator.send_json_to({'uuid': uuid, 'route': 'read', 'payload': 1})
+                self.assertEqual((await communicator.receive_json_from())['status'], StatusCodes.OK)
+                await communicator.disconnect()
+            self.assertEqual(checks, [1, 1])
@@ -0,0 +1,53 @@
+from unittest import IsolatedAsyncioTestCase
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group
+
+from django_observable_socket import AsyncSocketRouterConsumer, SocketRouterConsumer
+from django_observable_socket.classes import StatusCodes
+
+from .communicator import connect
+
+NAMES = [f'group {i:03}' for i in range(250)]
+
+
+def stream_names(queryset):
+    return (group.name for group in queryset.iterator())
+
+
+def consumers():
+    for base in (AsyncSocketRouterConsumer, SocketRouterConsumer):
+        yield type(f'Export{base.__name__}', (base,), {
+            '_routes': [{'route': 'export', 'dehydrate': stream_names}],
+            'on_export': lambda self, arg: {'payload': Group.objects.order_by('name')},
+        })
+
+
+class QuerysetStreams(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        await sync_to_async(Group.objects.bulk_create)([Group(name=name) for name in NAMES])
+
+    async def asyncTearDown(self):
+        await sync_to_async(Group.objects.all().delete)()
+
+    async def test_chunks(self):
+        for consumer in consumers():
+            communicator = await connect(consumer)
+            await communicator.send_json_to({'uuid': 'e', 'route': 'export'})
+            names = []
+            for index in range(3):
+                chunk = await communicator.receive_json_from()
+                self.assertEqual((chunk['status'], chunk['headers']), (StatusCodes.PARTIAL_CONTENT, {'Chunk': index}))
+                names.extend(chunk['payload'])
+            end = await communicator.receive_json_from()
+            self.assertEqual((end['status'], end['headers']), (StatusCodes.OK, {'Chunks': 3}))
+            self.assertEqual(names, NAMES)
+            await communicator.disconnect()
+
+    async def test_batches_collect_the_stream(self):
+        for consumer in consumers():
+            communicator = await connect(consumer)
+            await communicator.send_json_to([{'uuid': 'e', 'route': 'export'}])
+            (response,) = await communicator.receive_json_from()
+            self.assertEqual((response['status'], response['payload']), (StatusCodes.OK, NAMES))
+            await communicator.disconnect()
@@ -0,0 +1,61 @@
+from unittest import IsolatedAsyncioTestCase
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group
+
+from django_observable_socket import AsyncSocketRouterConsumer, SocketRouterConsumer
+from django_observable_socket.classes import StatusCodes
+
+from .communicator import connect
+
+
+def count_groups(data):
+    """a dehydrate function using the ORM"""
+    return {'title': data, 'groups': Group.objects.count()}
+
+
+def consumers():
+    for base in (AsyncSocketRouterConsumer, SocketRouterConsumer):
+        yield type(f'Watch{base.__name__}', (base,), {
+            '_routes': [{'route': 'watch', 'subscribe': lambda arg: f"article.{arg.payload['id']}",
+                         'dehydrate': count_groups, 'execution': {'dehydrate': 'thread'}}],
+            'on_watch': lambda self, arg: {'payload': 'initial'},
+        })
+
+
+class Publish(IsolatedAsyncioTestCase):
+    async def subscribe(self, consumer, uuid: str):
+        communicator = await connect(consumer)
+        await communicator.send_json_to({'uuid': uuid, 'route': 'watch', 'payload': {'id': 1}})
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['payload'], {'title': 'initial', 'groups': 0})
+        return communicator
+
+    async def assert_pushed(self, communicator, uuid: str, title: str):
+        self.assertEqual(await communicator.receive_json_from(), {
+            'uuid': uuid, 'status': StatusCodes.OK, 'headers': None, 'payload': {'title': title, 'groups': 0}})
+
+    async def test_publish_from_sync_code(self):
+        for consumer in consumers():
+            first, second = await self.subscribe(consumer, 'a'), await self.subscribe(consumer, 'b')
+            await sync_to_async(consumer.publish)('watch', 'article.1', 'updated')
+            await self.assert_pushed(first, 'a', 'updated')
+            await self.assert_pushed(second, 'b', 'updated')
+            await first.disconnect()
+            await second.disconnect()
+
+    async def test_apublish_follows_the_execution_policy(self):
+        for consumer in consumers():
+            communicator = await self.subscribe(consumer, 'a')
+            await consumer.apublish('watch', 'article.1', 'updated')
+            await self.assert_pushed(communicator, 'a', 'updated')
+            await communicator.disconnect()
+
+    async def test_unsubscribed_sockets_get_nothing(self):
+        for consumer in consumers():
+            communicator = await self.subscribe(consumer, 'a')
+            await communicator.send_json_to({'uuid': 'a', 'route': 'UNSUBSCRIBE'})
+            self.assertEqual((await communicator.receive_json_from())['status'], StatusCodes.NO_CONTENT)
+            await consumer.apublish('watch', 'article.1', 'updated')
+            self.assertTrue(await communicator.receive_nothing(0.1))
+            await communicator.disconnect()